@@ -0,0 +1,27 @@
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from users.tokens import cache_token, get_cached_token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication с кешем токена и пользователя на
+    TOKEN_CACHE_TIMEOUT. Кеш сбрасывается при выходе, смене пароля,
+    удалении токена и любом сохранении пользователя, но не при
+    QuerySet.update(). Кеш должен быть общим для воркеров, иначе отзыв
+    токена виден только в одном процессе, это проверяет
+    recipes.cache.check_shared_cache.
+    """
+
+    def authenticate_credentials(self, key):
+        token = get_cached_token(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache_token(token)
+            return user, token
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                'User inactive or deleted.'
+            )
+        return token.user, token
@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from recipes.models import Recipe, TimelineEntry
+from users.models import Follow
+
+FEED_ORDERING = ('-pub_date', '-id')
+
+
+def after(values, id_field='id'):
+    """Записи ленты после позиции курсора (pub_date, id)."""
+    if values is None:
+        return Q()
+    pub_date, id = values
+    return Q(pub_date__lt=pub_date) | Q(
+        pub_date=pub_date, **{f'{id_field}__lt': id}
+    )
+
+
+def read_feed_ids(user, values, limit):
+    """
+    Лента при чтении: по limit свежих рецептов каждого автора
+    из индекса (author, pub_date) сливаются в одном UNION ALL.
+    Если авторов слишком много или СУБД не умеет LIMIT внутри UNION,
+    выбирается общий запрос по author IN (...).
+    """
+    authors = list(Follow.objects.filter(
+        user=user
+    ).values_list('author_id', flat=True))
+    if not authors:
+        return []
+    recipes = Recipe.objects.filter(after(values)).order_by(*FEED_ORDERING)
+    if (len(authors) > settings.FEED_UNION_AUTHORS
+            or not connection.features.supports_slicing_ordering_in_compound):
+        return list(recipes.filter(
+            author_id__in=authors
+        ).values_list('id', flat=True)[:limit])
+    branches = [
+        recipes.filter(author_id=author).values_list('id', 'pub_date')[:limit]
+        for author in authors
+    ]
+    return [id for id, _ in branches[0].union(
+        *branches[1:], all=True
+    ).order_by(*FEED_ORDERING)[:limit]]
+
+
+def write_feed_ids(user, values, limit):
+    """Лента из строк TimelineEntry, разложенных при публикации."""
+    return list(TimelineEntry.objects.filter(
+        after(values, 'recipe_id'), user=user
+    ).order_by('-pub_date', '-recipe_id').values_list(
+        'recipe_id', flat=True
+    )[:limit])
+
+
+STRATEGIES = {
+    'read': read_feed_ids,
+    'write': write_feed_ids,
+}
+
+
+def get_feed(user, strategy, values, limit):
+    """Рецепты ленты user с отметками зрителя, от новых к старым."""
+    ids = STRATEGIES[strategy](user, values, limit)
+    recipes = Recipe.objects.with_user_flags(user).only(
+        'id', 'author', 'pub_date'
+    ).in_bulk(ids)
+    return [recipes[id] for id in ids if id in recipes]
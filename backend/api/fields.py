@@ -1,16 +1,72 @@
-import base64
+import binascii
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
 from rest_framework import serializers
 
+from recipes.images import rendition_urls
+
+IMAGE_FORMATS = ('jpeg', 'jpg', 'png', 'gif', 'webp')
+CHUNK_SIZE = 64 * 1024
+
 
 class Base64ImageField(serializers.ImageField):
     """Поле для Изображения."""
 
+    default_error_messages = {
+        'image_format': 'Формат изображения {ext} не поддерживается.',
+        'image_size': 'Изображение больше {max_size} байт.',
+        'image_base64': 'Изображение не в кодировке base64.',
+    }
+
+    def decode(self, imgstr, ext):
+        """
+        Декодировать base64 по частям во временный файл с лимитом.
+        Переводы строк и пробелы убираются заранее, чтобы каждая часть
+        была кратна четырем символам base64.
+        """
+        imgstr = ''.join(imgstr.split())
+        max_size = settings.MAX_IMAGE_SIZE
+        if len(imgstr) // 4 * 3 > max_size + 2:
+            self.fail('image_size', max_size=max_size)
+        upload = TemporaryUploadedFile(
+            'temp.' + ext, 'image/' + ext, 0, None
+        )
+        size = 0
+        try:
+            for start in range(0, len(imgstr), CHUNK_SIZE):
+                chunk = binascii.a2b_base64(
+                    imgstr[start:start + CHUNK_SIZE]
+                )
+                size += len(chunk)
+                if size > max_size:
+                    self.fail('image_size', max_size=max_size)
+                upload.write(chunk)
+        except binascii.Error:
+            upload.close()
+            self.fail('image_base64')
+        except serializers.ValidationError:
+            upload.close()
+            raise
+        upload.size = size
+        upload.seek(0)
+        return upload
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            ext = format.split('/')[-1].lower()
+            if ext not in IMAGE_FORMATS:
+                self.fail('image_format', ext=ext)
+            data = self.decode(imgstr, ext)
 
         return super().to_internal_value(data)
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии изображения."""
+
+    def to_representation(self, value):
+        return rendition_urls(
+            value.name if value else None, self.context.get('request')
+        )
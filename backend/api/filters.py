@@ -1,7 +1,36 @@
-  GNU nano 4.8                              backend/api/filters.py
+from django import forms
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 
-from recipes.models import Recipe, Tag, Ingredient
+from recipes.cache import TAGS_VERSION, get_version
+from recipes.models import Recipe, RecipeTag, Tag, Ingredient
+from recipes.search import search_recipes
+
+TAGS_ANY = 'any'
+TAGS_ALL = 'all'
+
+
+def get_tag_ids(slugs):
+    """id тегов по slug из закешированного словаря slug -> id."""
+    key = f'tag_slugs:{get_version(TAGS_VERSION)}'
+    slug_map = cache.get(key)
+    if slug_map is None:
+        slug_map = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, slug_map, settings.REFERENCE_CACHE_TIMEOUT)
+    return [slug_map[slug] for slug in slugs if slug in slug_map]
+
+
+class SlugsField(forms.MultipleChoiceField):
+    """Несколько значений без проверки по списку choices."""
+
+    def valid_value(self, value):
+        return True
+
+
+class TagsFilter(filters.MultipleChoiceFilter):
+    field_class = SlugsField
 
 
 class IngredientFilter(FilterSet):
@@ -13,12 +42,13 @@ class IngredientFilter(FilterSet):
 
 
 class RecipeFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all(),
+    tags = TagsFilter(method='filter_tags')
+    tags_mode = filters.ChoiceFilter(
+        choices=((TAGS_ANY, TAGS_ANY), (TAGS_ALL, TAGS_ALL)),
+        method='filter_tags_mode'
     )
 
+    search = filters.CharFilter(method='filter_search')
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
@@ -27,6 +57,33 @@ class RecipeFilter(FilterSet):
         model = Recipe
         fields = ('tags', 'author',)
 
+    def filter_tags(self, queryset, name, value):
+        slugs = set(value)
+        ids = get_tag_ids(slugs)
+        if self.form.cleaned_data.get('tags_mode') == TAGS_ALL:
+            if len(ids) < len(slugs):
+                return queryset.none()
+            for tag_id in ids:
+                queryset = queryset.annotate(**{
+                    f'has_tag_{tag_id}': Exists(RecipeTag.objects.filter(
+                        recipe=OuterRef('pk'), tag_id=tag_id
+                    ))
+                }).filter(**{f'has_tag_{tag_id}': True})
+            return queryset
+        if not ids:
+            return queryset.none()
+        return queryset.annotate(
+            has_tags=Exists(RecipeTag.objects.filter(
+                recipe=OuterRef('pk'), tag_id__in=ids
+            ))
+        ).filter(has_tags=True)
+
+    def filter_tags_mode(self, queryset, name, value):
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
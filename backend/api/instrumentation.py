@@ -0,0 +1,242 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+TRANSACTION_STATEMENTS = ('BEGIN', 'SAVEPOINT', 'RELEASE', 'ROLLBACK')
+
+
+class QueryBudgetExceededError(Exception):
+    """Запрос к API выполнил больше SQL-запросов, чем разрешено."""
+
+
+class QueryStats:
+    """
+    Считает SQL-запросы и время в БД через connection.execute_wrapper.
+    Управление транзакциями не считается: SQLite шлет BEGIN через курсор,
+    а psycopg2 нет, и в тестах каждый atomic() становится SAVEPOINT.
+    """
+
+    def __init__(self, keep_sql=False):
+        self.count = 0
+        self.duration = 0.0
+        self.keep_sql = keep_sql
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            if not sql.startswith(TRANSACTION_STATEMENTS):
+                self.count += 1
+                if self.keep_sql:
+                    self.statements.append(sql)
+
+    @contextmanager
+    def capture(self):
+        with connection.execute_wrapper(self):
+            yield self
+
+
+@contextmanager
+def assert_max_queries(limit):
+    """
+    Для тестов: упасть с QueryBudgetExceededError и списком SQL,
+    если в блоке выполнено больше limit запросов.
+    """
+    with QueryStats(keep_sql=True).capture() as stats:
+        yield stats
+    if stats.count > limit:
+        raise QueryBudgetExceededError(
+            f'{stats.count} запросов при бюджете {limit}:\n'
+            + '\n'.join(stats.statements)
+        )
+
+
+def get_budget(method, endpoint):
+    budgets = settings.QUERY_BUDGETS
+    return budgets.get(f'{method} {endpoint}', budgets.get(endpoint))
+
+
+class EndpointMetrics:
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+        self.seconds = 0.0
+        self.over_budget = 0
+        self.buckets = [0] * len(settings.METRICS_BUCKETS)
+
+
+class MetricsRegistry:
+    """Накопленные метрики эндпоинтов в пределах процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = defaultdict(EndpointMetrics)
+
+    def observe(self, method, endpoint, stats, render, total, over_budget):
+        with self.lock:
+            metrics = self.endpoints[(endpoint, method)]
+            metrics.requests += 1
+            metrics.queries += stats.count
+            metrics.db_seconds += stats.duration
+            metrics.render_seconds += render
+            metrics.seconds += total
+            metrics.over_budget += over_budget
+            for index, bound in enumerate(settings.METRICS_BUCKETS):
+                if total <= bound:
+                    metrics.buckets[index] += 1
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+            lines = []
+            for name, kind, help, value in (
+                ('foodgram_requests_total', 'counter',
+                 'Запросы к эндпоинту', lambda m: m.requests),
+                ('foodgram_db_queries_total', 'counter',
+                 'SQL-запросы', lambda m: m.queries),
+                ('foodgram_db_seconds_total', 'counter',
+                 'Время в БД', lambda m: m.db_seconds),
+                ('foodgram_render_seconds_total', 'counter',
+                 'Время рендеринга ответа', lambda m: m.render_seconds),
+                ('foodgram_query_budget_exceeded_total', 'counter',
+                 'Превышения бюджета запросов', lambda m: m.over_budget),
+            ):
+                lines.append(f'# HELP {name} {help}')
+                lines.append(f'# TYPE {name} {kind}')
+                for (endpoint, method), metrics in endpoints:
+                    lines.append(
+                        f'{name}{{endpoint="{endpoint}",method="{method}"}} '
+                        f'{value(metrics)}'
+                    )
+            name = 'foodgram_request_duration_seconds'
+            lines.append(f'# HELP {name} Полное время ответа')
+            lines.append(f'# TYPE {name} histogram')
+            for (endpoint, method), metrics in endpoints:
+                labels = f'endpoint="{endpoint}",method="{method}"'
+                for bound, count in zip(
+                    settings.METRICS_BUCKETS, metrics.buckets
+                ):
+                    lines.append(
+                        f'{name}_bucket{{{labels},le="{bound}"}} {count}'
+                    )
+                lines.append(
+                    f'{name}_bucket{{{labels},le="+Inf"}} {metrics.requests}'
+                )
+                lines.append(f'{name}_sum{{{labels}}} {metrics.seconds}')
+                lines.append(f'{name}_count{{{labels}}} {metrics.requests}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class InstrumentationMiddleware:
+    """
+    Для каждого эндпоинта считает SQL-запросы, время в БД, время
+    рендеринга и полное время, отдает их в Server-Timing и в /metrics.
+    Число запросов сверяется с settings.QUERY_BUDGETS, при
+    QUERY_BUDGET_STRICT превышение поднимает QueryBudgetExceededError.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        stats = QueryStats(keep_sql=settings.QUERY_BUDGET_STRICT)
+        request.render_seconds = 0.0
+        with stats.capture():
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                request, response.streaming_content, stats, started
+            )
+            return response
+        total = time.perf_counter() - started
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = ', '.join((
+                f'db;dur={stats.duration * 1000:.1f};'
+                f'desc="{stats.count} queries"',
+                f'render;dur={request.render_seconds * 1000:.1f}',
+                f'total;dur={total * 1000:.1f}',
+            ))
+        self.finish(request, stats, total)
+        return response
+
+    def process_template_response(self, request, response):
+        render_started = time.perf_counter()
+
+        def rendered(response):
+            request.render_seconds = time.perf_counter() - render_started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def stream(self, request, content, stats, started):
+        """Тело StreamingHttpResponse читает БД уже после middleware."""
+        with stats.capture():
+            yield from content
+        self.finish(request, stats, time.perf_counter() - started)
+
+    def finish(self, request, stats, total):
+        match = request.resolver_match
+        if match is None:
+            return
+        endpoint = match.url_name or match.route
+        budget = get_budget(request.method, endpoint)
+        over_budget = budget is not None and stats.count > budget
+        registry.observe(
+            request.method, endpoint, stats,
+            request.render_seconds, total, over_budget
+        )
+        if not over_budget:
+            return
+        message = (
+            f'{request.method} {endpoint}: {stats.count} запросов '
+            f'при бюджете {budget}'
+        )
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceededError(
+                message + ':\n' + '\n'.join(stats.statements)
+            )
+        logger.warning(message)
+
+
+def metrics_allowed(request):
+    """
+    Метрики видны сотрудникам и сборщику с заголовком
+    Authorization: Bearer <METRICS_TOKEN>. Адрес клиента не проверяется:
+    за nginx все запросы приходят с 127.0.0.1.
+    """
+    if request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    return bool(token) and constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    )
+
+
+def metrics(request):
+    """Метрики эндпоинтов для Prometheus."""
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(), content_type=PROMETHEUS_CONTENT_TYPE
+    )
@@ -0,0 +1,135 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from api.representations import recipe_bodies
+from recipes.cache import (
+    INGREDIENTS_VERSION,
+    RECIPE_VERSION,
+    TAGS_VERSION,
+    USER_VERSION,
+    get_version,
+    get_versions
+)
+
+VIEWER_FLAGS = ('is_favorited', 'is_in_shopping_cart')
+
+
+class CachedListMixin:
+    """
+    Список справочника из кеша Django с ETag и Last-Modified.
+    Кеш сбрасывается сменой версии cache_version при изменении данных.
+    """
+
+    cache_version = None
+
+    def get_list_data(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs).data
+
+    def is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            return etag in (tag.strip() for tag in if_none_match.split(','))
+        if_modified_since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+        )
+        return (if_modified_since is not None
+                and last_modified <= if_modified_since)
+
+    def list(self, request, *args, **kwargs):
+        version = get_version(self.cache_version)
+        last_modified = version // 10 ** 9
+        etag = '"{}"'.format(hashlib.md5(
+            f'{version}:{request.get_full_path()}:'
+            f'{request.accepted_media_type}'.encode()
+        ).hexdigest())
+        if self.is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            key = f'{self.cache_version}:{etag}'
+            data = cache.get(key)
+            if data is None:
+                data = self.get_list_data(request, *args, **kwargs)
+                cache.set(key, data, settings.REFERENCE_CACHE_TIMEOUT)
+            response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+class CachedRecipesMixin:
+    """
+    Рецепты из кеша готовых представлений без данных зрителя.
+    Ключ собирается из версий рецепта, автора, тегов и ингредиентов,
+    is_favorited, is_in_shopping_cart и is_subscribed берутся
+    из аннотаций страницы и подставляются при ответе.
+    """
+
+    def get_body_keys(self, recipes):
+        request = self.request
+        versions = get_versions(
+            {RECIPE_VERSION.format(recipe.id) for recipe in recipes}
+            | {USER_VERSION.format(recipe.author_id) for recipe in recipes}
+            | {TAGS_VERSION, INGREDIENTS_VERSION}
+        )
+        prefix = 'recipe:{}://{}:{}:{}'.format(
+            request.scheme,
+            request.get_host(),
+            versions[TAGS_VERSION],
+            versions[INGREDIENTS_VERSION]
+        )
+        return {
+            recipe.id: '{}:{}:{}:{}'.format(
+                prefix,
+                recipe.id,
+                versions[RECIPE_VERSION.format(recipe.id)],
+                versions[USER_VERSION.format(recipe.author_id)]
+            )
+            for recipe in recipes
+        }
+
+    def get_recipes_data(self, recipes):
+        keys = self.get_body_keys(recipes)
+        cached = cache.get_many(list(keys.values()))
+        bodies = {id: cached[key] for id, key in keys.items() if key in cached}
+        missing = [id for id in keys if id not in bodies]
+        if missing:
+            rendered = recipe_bodies(missing, self.request)
+            cache.set_many(
+                {keys[id]: body for id, body in rendered.items()},
+                settings.RECIPE_CACHE_TIMEOUT
+            )
+            bodies.update(rendered)
+        data = []
+        for recipe in recipes:
+            if recipe.id not in bodies:
+                continue
+            body = dict(bodies[recipe.id])
+            for flag in VIEWER_FLAGS:
+                body[flag] = getattr(recipe, flag, False)
+            body['author'] = dict(
+                body['author'],
+                is_subscribed=getattr(recipe, 'is_subscribed', False)
+            )
+            data.append(body)
+        return data
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(self.get_recipes_data(list(queryset)))
+        return self.get_paginated_response(self.get_recipes_data(page))
+
+    def retrieve(self, request, *args, **kwargs):
+        data = self.get_recipes_data([self.get_object()])
+        if not data:
+            raise NotFound
+        return Response(data[0])
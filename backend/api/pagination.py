@@ -1,6 +1,150 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = 6
+
+
+class KeysetPagination(BasePagination):
+    """
+    Постраничный вывод по курсору без OFFSET.
+    Курсор хранит значения полей ordering последней записи страницы,
+    count считается только по запросу ?count=true.
+    """
+
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def encode_cursor(self, item):
+        values = []
+        for field in self.ordering:
+            value = getattr(item, field.lstrip('-'))
+            values.append(
+                value.isoformat() if hasattr(value, 'isoformat') else value
+            )
+        return base64.urlsafe_b64encode(
+            json.dumps(values).encode()
+        ).decode()
+
+    def decode_cursor(self, request, model):
+        """
+        Значения курсора, приведенные к типам полей ordering модели model.
+        Любой испорченный курсор - 404, а не ошибка при сборке запроса.
+        """
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            values = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def after(self, values):
+        """Условие "после позиции values" для составного ключа ordering."""
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = getattr(view, 'cursor_ordering', self.ordering)
+        self.count = None
+        if request.query_params.get(self.count_query_param) == 'true':
+            self.count = queryset.count()
+        queryset = queryset.order_by(*self.ordering)
+        values = self.decode_cursor(request, queryset.model)
+        if values is not None:
+            queryset = queryset.filter(self.after(values))
+        page_size = self.get_page_size(request)
+        return self.get_page(list(queryset[:page_size + 1]), page_size)
+
+    def paginate_with(self, fetch, request, model):
+        """
+        Страница из fetch(values, limit), которая сама отбирает limit
+        записей model после позиции курсора values в порядке ordering.
+        """
+        self.request = request
+        self.count = None
+        page_size = self.get_page_size(request)
+        return self.get_page(
+            fetch(self.decode_cursor(request, model), page_size + 1),
+            page_size
+        )
+
+    def get_page(self, items, page_size):
+        self.next_cursor = None
+        if len(items) > page_size:
+            items = items[:page_size]
+            self.next_cursor = self.encode_cursor(items[-1])
+        return items
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.next_cursor
+        )
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = None
+        response['results'] = data
+        return Response(response)
+
+
+class KeysetPaginationMixin:
+    """Включает KeysetPagination, если в запросе передан параметр cursor."""
+
+    cursor_ordering = KeysetPagination.ordering
+
+    @property
+    def paginator(self):
+        if (not hasattr(self, '_paginator')
+                and KeysetPagination.cursor_query_param
+                in self.request.query_params):
+            self._paginator = KeysetPagination()
+        return super().paginator
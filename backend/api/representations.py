@@ -0,0 +1,90 @@
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+
+from recipes.images import rendition_urls
+from recipes.models import Recipe, RecipeIngredient, RecipeTag
+
+AUTHOR_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit')
+
+
+def image_url(name, request=None):
+    """Ссылка на изображение, как её отдаёт ImageField."""
+    if not name:
+        return None
+    url = default_storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def recipe_bodies(ids, request=None):
+    """
+    Представления рецептов ids без отметок зрителя: is_favorited,
+    is_in_shopping_cart и is_subscribed автора равны False.
+    """
+    tags = defaultdict(list)
+    for row in RecipeTag.objects.filter(recipe_id__in=ids).values_list(
+        'recipe_id', *(f'tag__{field}' for field in TAG_FIELDS)
+    ).order_by('tag__name', 'tag__slug'):
+        tags[row[0]].append(dict(zip(TAG_FIELDS, row[1:])))
+    ingredients = defaultdict(list)
+    for row in RecipeIngredient.objects.filter(
+        recipe_id__in=ids
+    ).values_list(
+        'recipe_id',
+        *(f'ingredient__{field}' for field in INGREDIENT_FIELDS),
+        'amount'
+    ).order_by('id'):
+        ingredients[row[0]].append(
+            dict(zip(INGREDIENT_FIELDS + ('amount',), row[1:]))
+        )
+    bodies = {}
+    for row in Recipe.objects.filter(id__in=ids).values_list(
+        'id', 'name', 'image', 'text', 'cooking_time',
+        *(f'author__{field}' for field in AUTHOR_FIELDS)
+    ).order_by():
+        id, name, image, text, cooking_time = row[:5]
+        author = dict(zip(AUTHOR_FIELDS, row[5:]))
+        author['is_subscribed'] = False
+        bodies[id] = {
+            'id': id,
+            'tags': tags[id],
+            'author': author,
+            'ingredients': ingredients[id],
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+            'name': name,
+            'image': image_url(image, request),
+            'image_renditions': rendition_urls(image, request),
+            'text': text,
+            'cooking_time': cooking_time,
+        }
+    return bodies
+
+
+def short_recipe(recipe, request=None):
+    """Краткое представление рецепта, как у FavoriteSerializerRead."""
+    return {
+        'id': recipe.id,
+        'name': recipe.name,
+        'image': image_url(recipe.image.name, request),
+        'image_renditions': rendition_urls(recipe.image.name, request),
+        'cooking_time': recipe.cooking_time,
+    }
+
+
+def subscription(author, request=None):
+    """
+    Автор из подписок: поля пользователя, его рецепты и recipes_count.
+    Ожидает аннотацию is_subscribed и рецепты в recipes_page.
+    """
+    data = {field: getattr(author, field) for field in AUTHOR_FIELDS}
+    data['is_subscribed'] = author.is_subscribed
+    data['recipes'] = [
+        short_recipe(recipe, request) for recipe in author.recipes_page
+    ]
+    data['recipes_count'] = author.recipes_count
+    return data
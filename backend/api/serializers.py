@@ -1,10 +1,12 @@
+from django.conf import settings
 from django.contrib.auth.hashers import make_password
 from django.db import transaction
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
 
-from api.fields import Base64ImageField
+from api.fields import Base64ImageField, ImageRenditionsField
+from recipes.images import schedule_renditions
+from recipes.matching import recipe_changed
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -12,6 +14,7 @@ from recipes.models import (
     RecipeIngredient,
     RecipeTag,
     ShoppingCart,
+    ShoppingListItem,
     Tag
 )
 from users.models import User, Follow
@@ -48,6 +51,8 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
@@ -71,7 +76,7 @@ class UserPasswordSerializer(serializers.Serializer):
         password = make_password(
             validated_data.get('new_password'))
         user.password = password
-        user.save()
+        user.save(update_fields=['password'])
         return validated_data
 
 
@@ -151,6 +156,7 @@ class RecipeSerializerRead(serializers.ModelSerializer):
     )
     is_in_shopping_cart = serializers.SerializerMethodField(
         method_name='get_is_in_shopping_cart')
+    image_renditions = ImageRenditionsField(source='image')
 
     class Meta:
         model = Recipe
@@ -163,11 +169,19 @@ class RecipeSerializerRead(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_renditions',
             'text',
             'cooking_time'
         )
 
+    def to_representation(self, instance):
+        if hasattr(instance, 'is_subscribed'):
+            instance.author.is_subscribed = instance.is_subscribed
+        return super().to_representation(instance)
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
@@ -177,6 +191,8 @@ class RecipeSerializerRead(serializers.ModelSerializer):
         ).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
@@ -211,7 +227,9 @@ class RecipeSerializerWrite(serializers.ModelSerializer):
         )
 
     def validate(self, data):
-        ingredients = data['ingredients']
+        ingredients = data.get('ingredients')
+        if ingredients is None:
+            return data
         recipe_list = []
         for ingredient in ingredients:
             amount = ingredient['amount']
@@ -224,12 +242,21 @@ class RecipeSerializerWrite(serializers.ModelSerializer):
                     {'ingredient': 'Такой ингредиент уже есть'}
                 )
             recipe_list.append(ingredient['id'])
+        found = Ingredient.objects.in_bulk(recipe_list)
+        missing = [id for id in recipe_list if id not in found]
+        if missing:
+            raise serializers.ValidationError(
+                {'ingredients': f'Ингредиенты не найдены: {missing}'}
+            )
+        for ingredient in ingredients:
+            ingredient['ingredient'] = found[ingredient['id']]
         return data
 
     def create_ingredients(self, ingredients, recipe):
+        recipe_changed(recipe.id)
         RecipeIngredient.objects.bulk_create([
             RecipeIngredient(
-                ingredient=Ingredient.objects.get(id=ingredient['id']),
+                ingredient=ingredient['ingredient'],
                 recipe=recipe,
                 amount=ingredient['amount']
             ) for ingredient in ingredients
@@ -248,101 +275,97 @@ class RecipeSerializerWrite(serializers.ModelSerializer):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
-        recipe.tags.set(tags)
+        validated_data['image'].close()
+        schedule_renditions(recipe.image.name)
+        self.create_tags(tags, recipe)
         self.create_ingredients(recipe=recipe, ingredients=ingredients)
         return recipe
 
+    def update_tags(self, tags, recipe):
+        current = set(RecipeTag.objects.filter(
+            recipe=recipe
+        ).values_list('tag_id', flat=True))
+        removed = current - {tag.id for tag in tags}
+        if removed:
+            RecipeTag.objects.filter(
+                recipe=recipe, tag_id__in=removed
+            ).delete()
+        self.create_tags(
+            [tag for tag in tags if tag.id not in current], recipe
+        )
+
+    def update_ingredients(self, ingredients, recipe):
+        current = {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(recipe=recipe)
+        }
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        delta = dict(amounts)
+        for ingredient_id, row in current.items():
+            delta[ingredient_id] = delta.get(ingredient_id, 0) - row.amount
+        ShoppingListItem.objects.apply(
+            ShoppingCart.objects.filter(
+                recipe=recipe
+            ).values_list('user_id', flat=True),
+            delta
+        )
+        removed = current.keys() - amounts.keys()
+        if removed:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        changed = []
+        for ingredient_id, row in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        self.create_ingredients(
+            [ingredient for ingredient in ingredients
+             if ingredient['id'] not in current],
+            recipe
+        )
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        RecipeTag.objects.filter(recipe=instance).delete()
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        ingredients = validated_data.pop('ingredients')
-        self.create_ingredients(ingredients, instance)
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        if tags is not None:
+            self.update_tags(tags, instance)
+        if ingredients is not None:
+            self.update_ingredients(ingredients, instance)
         super().update(instance, validated_data)
+        if 'image' in validated_data:
+            validated_data['image'].close()
+            schedule_renditions(instance.image.name)
         return instance
 
     def to_representation(self, instance):
+        request = self.context.get('request')
         return RecipeSerializerRead(
-            instance,
+            Recipe.objects.for_read(request.user).get(pk=instance.pk),
             context={
-                'request': self.context.get('request')
+                'request': request
             }).data
 
 
-class FollowSerializerRead(serializers.ModelSerializer):
-    """Сериализатор для получения Подписки."""
-
-    is_subscribed = serializers.SerializerMethodField()
-    recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
-
-    class Meta:
-        model = User
-        fields = (
-            'email',
-            'id',
-            'username',
-            'first_name',
-            'last_name',
-            'is_subscribed',
-            'recipes',
-            'recipes_count'
-        )
-
-    def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if request is None or request.user.is_anonymous:
-            return False
-        return Follow.objects.filter(
-            user=request.user,
-            author=obj
-        ).exists()
-
-    def get_recipes(self, obj):
-        request = self.context.get('request')
-        if not request or request.user.is_anonymous:
-            return False
-        recipes = Recipe.objects.filter(author=obj)
-        limit = request.query_params.get('recipes_limit')
-        if limit:
-            recipes = recipes[:int(limit)]
-        return FavoriteSerializerRead(
-            recipes,
-            many=True,
-            context={'request': request}
-        ).data
-
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
-
-
-class FollowSerializerWrite(serializers.ModelSerializer):
-    """Сериализатор для Подписки."""
-
-    class Meta:
-        model = Follow
-        fields = ['user', 'author']
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Follow.objects.all(),
-                fields=['user', 'author'],
-            )
-        ]
-
-    def to_representation(self, instance):
-        return FollowSerializerRead(
-            instance.author,
-            context={'request': self.context.get('request')}).data
-
-
 class FavoriteSerializerRead(serializers.ModelSerializer):
     """Сериализатор для получения Избранного."""
 
+    image_renditions = ImageRenditionsField(source='image')
+
     class Meta:
         model = Recipe
         fields = (
             'id',
             'name',
             'image',
+            'image_renditions',
             'cooking_time'
         )
 
@@ -377,3 +400,43 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         return FavoriteSerializerRead(instance.recipe, context={
             'request': self.context.get('request')
         }).data
+
+
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    """Сериализатор сводного списка покупок."""
+
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = ShoppingListItem
+        fields = (
+            'id',
+            'name',
+            'measurement_unit',
+            'amount',
+        )
+
+
+class RecipeMatchSerializer(serializers.Serializer):
+    """Сериализатор рецепта, подобранного по ингредиентам."""
+
+    recipe = FavoriteSerializerRead()
+    coverage = serializers.FloatField()
+    missing = IngredientSerializer(many=True)
+
+
+class BatchSerializer(serializers.Serializer):
+    """Сериализатор списка id для пакетных запросов."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_ITEMS
+    )
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
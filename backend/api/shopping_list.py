@@ -0,0 +1,154 @@
+import csv
+import io
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer
+
+from recipes.models import ShoppingListItem
+
+TITLE = 'Cписок покупок:'
+FILENAME = 'shopping_list'
+
+
+def get_ingredients(user):
+    """Ингредиенты из сводного списка покупок пользователя."""
+    return ShoppingListItem.objects.filter(
+        user=user
+    ).values(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        ingredient_amount=F('amount')
+    ).order_by('ingredient__name').iterator()
+
+
+def ingredient_line(ingredient):
+    return (
+        f"{ingredient['ingredient__name']} - "
+        f"{ingredient['ingredient_amount']} "
+        f"{ingredient['ingredient__measurement_unit']}"
+    )
+
+
+class Echo:
+    """Буфер для csv.writer, отдающий строку сразу."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer, ABC):
+    """
+    Базовый формат списка покупок.
+    stream() отдает файл по частям, render() нужен DRF для ошибок.
+    """
+
+    charset = 'utf-8'
+
+    @abstractmethod
+    def stream(self, ingredients):
+        """Части файла со списком ingredients, str или bytes."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return '\n'.join(str(value) for value in data.values())
+        return b''.join(
+            part.encode(self.charset) if isinstance(part, str) else part
+            for part in self.stream(data)
+        )
+
+
+class TextRenderer(ShoppingListRenderer):
+    """Список покупок в виде текста."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        yield TITLE
+        for ingredient in ingredients:
+            yield '\n' + ingredient_line(ingredient)
+
+
+class CsvRenderer(ShoppingListRenderer):
+    """Список покупок в формате CSV."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('name', 'amount', 'measurement_unit'))
+        for ingredient in ingredients:
+            yield writer.writerow((
+                ingredient['ingredient__name'],
+                ingredient['ingredient_amount'],
+                ingredient['ingredient__measurement_unit'],
+            ))
+
+
+class PdfRenderer(ShoppingListRenderer):
+    """Список покупок в формате PDF."""
+
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    font = 'ShoppingListFont'
+    font_size = 12
+    margin = 50
+    chunk_size = 64 * 1024
+
+    def register_font(self):
+        if self.font not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(
+                TTFont(self.font, settings.PDF_FONT_PATH)
+            )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return TextRenderer().render(data).encode('utf-8')
+        return b''.join(self.stream(data))
+
+    def stream(self, ingredients):
+        self.register_font()
+        buffer = io.BytesIO()
+        height = A4[1]
+        line_height = self.font_size * 1.5
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        pdf.setFont(self.font, self.font_size)
+        y = height - self.margin
+        pdf.drawString(self.margin, y, TITLE)
+        for ingredient in ingredients:
+            y -= line_height
+            if y < self.margin:
+                pdf.showPage()
+                pdf.setFont(self.font, self.font_size)
+                y = height - self.margin
+            pdf.drawString(self.margin, y, ingredient_line(ingredient))
+        pdf.save()
+        buffer.seek(0)
+        yield from iter(lambda: buffer.read(self.chunk_size), b'')
+
+
+RENDERERS = (PdfRenderer, CsvRenderer, TextRenderer)
+
+
+def shopping_list_response(ingredients, renderer):
+    """Потоковый ответ со списком покупок в формате renderer."""
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type += f'; charset={renderer.charset}'
+    response = StreamingHttpResponse(
+        renderer.stream(ingredients),
+        content_type=content_type
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{FILENAME}.{renderer.format}"'
+    )
+    return response
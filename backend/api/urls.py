@@ -2,11 +2,13 @@ from django.urls import include, path
 from djoser import views
 from rest_framework.routers import DefaultRouter
 
+from api.instrumentation import metrics
 from api.views import (
     UsersViewSet,
     IngredientViewSet,
     TagViewSet,
     RecipeViewSet,
+    FollowBatchView,
     FollowViewRead,
     FollowViewWrite,
     download_shopping_cart,
@@ -38,11 +40,17 @@ urlpatterns = [
         FollowViewRead.as_view(),
         name='subscriptions'
     ),
+    path(
+        'users/subscribe/',
+        FollowBatchView.as_view(),
+        name='subscribe-batch'
+    ),
     path(
         'users/<int:id>/subscribe/',
         FollowViewWrite.as_view(),
         name='subscribe'
     ),
+    path('metrics/', metrics, name='metrics'),
     path(
         'recipes/download_shopping_cart/',
         download_shopping_cart,
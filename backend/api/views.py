@@ -1,15 +1,22 @@
+from django.conf import settings as django_settings
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.hashers import make_password
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import (
+    BooleanField,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Value
+)
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser import utils
 from djoser.compat import get_user_email
 from djoser.conf import settings
 from djoser.views import UserViewSet
-from rest_framework import status, views, generics, viewsets
-from rest_framework.decorators import action, api_view
+from rest_framework import status, generics, viewsets
+from rest_framework.decorators import action, api_view, renderer_classes
 from rest_framework.generics import ListAPIView
 from rest_framework.permissions import (
     IsAuthenticated,
@@ -19,27 +26,48 @@ from rest_framework.permissions import (
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from api.feed import STRATEGIES, get_feed
 from api.filters import RecipeFilter, IngredientFilter
-from api.pagination import CustomPagination
+from api.mixins import CachedListMixin, CachedRecipesMixin
+from api.pagination import (
+    CustomPagination,
+    KeysetPagination,
+    KeysetPaginationMixin
+)
 from api.permissions import AdminOrAuthorOrReadOnly
+from api.representations import subscription
 from api.serializers import (
+    BatchSerializer,
     CustomUserSerializer,
     UserCreateSerializer,
     IngredientSerializer,
     TagSerializer,
     RecipeSerializerWrite,
     RecipeSerializerRead,
-    FollowSerializerWrite,
-    FollowSerializerRead
+    RecipeMatchSerializer,
+    ShoppingListItemSerializer
+)
+from api.shopping_list import (
+    RENDERERS,
+    get_ingredients,
+    shopping_list_response
 )
+from recipes.cache import INGREDIENTS_VERSION, TAGS_VERSION
+from recipes.ingredient_index import ingredient_index
+from recipes.matching import match_index
 from recipes.models import (
     Ingredient,
     Tag,
     Recipe,
     Favorite,
-    ShoppingCart, RecipeIngredient
+    ShoppingCart,
+    ShoppingListItem,
+    TimelineEntry
 )
-from users.models import User, Follow
+from users.models import User, Follow, counter_shift
+from users.tokens import forget_user_tokens
+
+SELF_SUBSCRIBE_ERROR = 'Нельзя подписаться на самого себя!'
 
 
 class UsersViewSet(UserViewSet):
@@ -51,6 +79,15 @@ class UsersViewSet(UserViewSet):
     def get_queryset(self):
         return User.objects.all()
 
+    def get_instance(self):
+        """
+        request.user из кеша токенов может отставать на
+        TOKEN_CACHE_TIMEOUT, изменять /me/ нужно по свежей строке.
+        """
+        if self.request.method in SAFE_METHODS:
+            return self.request.user
+        return User.objects.get(pk=self.request.user.pk)
+
     def get_serializer_class(self):
         if self.action == 'set_password':
             if settings.SET_PASSWORD_RETYPE:
@@ -70,7 +107,8 @@ class UsersViewSet(UserViewSet):
         serializer.is_valid(raise_exception=True)
 
         self.request.user.set_password(serializer.data['new_password'])
-        self.request.user.save()
+        self.request.user.save(update_fields=['password'])
+        forget_user_tokens(self.request.user.id)
 
         if settings.PASSWORD_CHANGED_EMAIL_CONFIRMATION:
             context = {'user': self.request.user}
@@ -101,14 +139,41 @@ class TokenCreateView(utils.ActionViewMixin, generics.GenericAPIView):
         )
 
 
-class TokenDestroyView(views.APIView):
-    """Удаление токена."""
+def with_subscription_data(users, request):
+    """
+    Авторы для ответа о подписке: is_subscribed и рецепты
+    с учетом recipes_limit в recipes_page.
+    """
+    recipes = Recipe.objects.all()
+    limit = request.query_params.get('recipes_limit')
+    if limit:
+        recipes = recipes.filter(id__in=Subquery(
+            Recipe.objects.filter(
+                author=OuterRef('author')
+            ).values('id')[:int(limit)]
+        ))
+    recipes = recipes.only('id', 'name', 'image', 'cooking_time', 'author')
+    return users.annotate(
+        is_subscribed=Value(True, output_field=BooleanField()),
+    ).prefetch_related(
+        Prefetch('recipes', queryset=recipes, to_attr='recipes_page')
+    )
 
-    permission_classes = settings.PERMISSIONS.token_destroy
 
-    def post(self, request):
-        utils.logout_user(request)
-        return Response(status=status.HTTP_204_NO_CONTENT)
+def batch_results(ids, found, changed, add):
+    """Итог пакетного запроса по каждому id в порядке запроса."""
+    done, skipped = ('added', 'exists') if add else ('removed', 'missing')
+    return [
+        {
+            'id': id,
+            'status': (
+                done if id in changed
+                else skipped if id in found
+                else 'not_found'
+            )
+        }
+        for id in ids
+    ]
 
 
 class FollowViewWrite(APIView):
@@ -117,52 +182,92 @@ class FollowViewWrite(APIView):
     permission_classes = (IsAuthenticated,)
 
     def post(self, request, id):
-        data = {
-            'user': request.user.id,
-            'author': id
-        }
-        serializer = FollowSerializerWrite(
-            data=data,
-            context={'request': request}
+        if id == request.user.id:
+            return Response({'errors': SELF_SUBSCRIBE_ERROR},
+                            status=status.HTTP_400_BAD_REQUEST)
+        author = get_object_or_404(
+            with_subscription_data(User.objects.all(), request), id=id
+        )
+        with transaction.atomic():
+            if not Follow.objects.add(user_id=request.user.id, author_id=id):
+                return Response({'errors': 'Вы уже подписаны!'},
+                                status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            subscription(author, request), status=status.HTTP_201_CREATED
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, id):
-        author = get_object_or_404(User, id=id)
-        if Follow.objects.filter(
-                user=request.user,
-                author=author).exists():
-            subscription = get_object_or_404(
-                Follow,
-                user=request.user,
-                author=author
-            )
-            subscription.delete()
+        if Follow.objects.remove(user_id=request.user.id, author_id=id):
             return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(User, id=id)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
 
-class FollowViewRead(ListAPIView):
+class FollowBatchView(APIView):
+    """Подписаться/отписаться на/от нескольких пользователей."""
+
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        return self.apply(request, add=True)
+
+    def delete(self, request):
+        return self.apply(request, add=False)
+
+    def apply(self, request, add):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        user_id = request.user.id
+        if add and user_id in ids:
+            return Response({'errors': SELF_SUBSCRIBE_ERROR},
+                            status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            found = set(User.objects.filter(
+                id__in=ids
+            ).values_list('id', flat=True))
+            if add:
+                changed = Follow.objects.add_many(
+                    'author_id', found, user_id=user_id
+                )
+            else:
+                changed = Follow.objects.remove_many(
+                    'author_id', found, user_id=user_id
+                )
+            if changed:
+                if add:
+                    TimelineEntry.objects.backfill(user_id, changed)
+                else:
+                    TimelineEntry.objects.drop(user_id, changed)
+                User.objects.filter(id__in=changed).update(
+                    followers_count=counter_shift(
+                        'followers_count', 1 if add else -1
+                    )
+                )
+        return Response({'results': batch_results(ids, found, changed, add)})
+
+
+class FollowViewRead(KeysetPaginationMixin, ListAPIView):
     """Возвращает пользователей, на которых подписан текущий пользователь."""
 
     permission_classes = [IsAuthenticated, ]
     pagination_class = CustomPagination
+    cursor_ordering = ('-id',)
+
+    def get_queryset(self):
+        return with_subscription_data(
+            User.objects.filter(author__user=self.request.user),
+            self.request
+        )
 
     def get(self, request, *args, **kwargs):
-        user = request.user
-        queryset = User.objects.filter(author__user=user)
-        page = self.paginate_queryset(queryset)
-        serializer = FollowSerializerRead(
-            page,
-            many=True,
-            context={'request': request}
+        page = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response(
+            [subscription(author, request) for author in page]
         )
-        return self.get_paginated_response(serializer.data)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedListMixin, viewsets.ReadOnlyModelViewSet):
     """Игредиенты."""
 
     permission_classes = (IsAuthenticatedOrReadOnly, )
@@ -170,18 +275,30 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = IngredientSerializer
     filterset_class = IngredientFilter
     pagination_class = None
+    cache_version = INGREDIENTS_VERSION
 
+    def get_list_data(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            return ingredient_index.search(name)
+        return list(self.filter_queryset(self.get_queryset()).values(
+            *IngredientSerializer.Meta.fields
+        ))
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+
+class TagViewSet(CachedListMixin, viewsets.ReadOnlyModelViewSet):
     """Теги."""
 
     permission_classes = (AllowAny,)
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    cache_version = TAGS_VERSION
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    CachedRecipesMixin, KeysetPaginationMixin, viewsets.ModelViewSet
+):
     """
     Создать/получить/обновить/удалить рецепт.
     Добавить/удалить рецепт в/из список покупок/избранное .
@@ -193,6 +310,15 @@ class RecipeViewSet(viewsets.ModelViewSet):
     pagination_class = CustomPagination
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve'):
+            return Recipe.objects.with_user_flags(self.request.user).only(
+                'id', 'author', 'pub_date'
+            )
+        if self.request.method in SAFE_METHODS:
+            return Recipe.objects.for_read(self.request.user)
+        return Recipe.objects.all()
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -222,40 +348,169 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return self.add_to(ShoppingCart, request.user, pk)
         return self.delete_from(ShoppingCart, request.user, pk)
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='favorite',
+        url_name='favorite-batch',
+        permission_classes=[IsAuthenticated]
+    )
+    def favorite_batch(self, request):
+        return self.apply_batch(Favorite, request)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch',
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_batch(self, request):
+        return self.apply_batch(ShoppingCart, request)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_list(self, request):
+        serializer = ShoppingListItemSerializer(
+            ShoppingListItem.objects.filter(
+                user=request.user
+            ).select_related('ingredient').order_by('ingredient__name'),
+            many=True
+        )
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated]
+    )
+    def feed(self, request):
+        strategy = request.query_params.get(
+            'strategy', django_settings.FEED_STRATEGY
+        )
+        if strategy not in STRATEGIES:
+            return Response(
+                {'errors': f'Неизвестная стратегия {strategy}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        paginator = KeysetPagination()
+        page = paginator.paginate_with(
+            lambda values, limit: get_feed(
+                request.user, strategy, values, limit
+            ),
+            request,
+            Recipe
+        )
+        return paginator.get_paginated_response(
+            self.get_recipes_data(page)
+        )
+
+    @action(detail=False, methods=['get'])
+    def match(self, request):
+        try:
+            ingredient_ids = {
+                int(id)
+                for value in request.query_params.getlist('ingredients')
+                for id in value.split(',') if id
+            }
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            return Response(
+                {'errors': 'Ингредиенты и limit должны быть числами'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        matches = match_index.match(ingredient_ids, limit)
+        recipes = Recipe.objects.in_bulk(
+            [recipe_id for recipe_id, _, _ in matches]
+        )
+        ingredients = Ingredient.objects.in_bulk(
+            {id for _, _, missing in matches for id in missing}
+        )
+        serializer = RecipeMatchSerializer(
+            [
+                {
+                    'recipe': recipes[recipe_id],
+                    'coverage': round(coverage, 4),
+                    'missing': [ingredients[id] for id in missing],
+                }
+                for recipe_id, coverage, missing in matches
+                if recipe_id in recipes
+            ],
+            many=True,
+            context={'request': request}
+        )
+        return Response(serializer.data)
+
     def add_to(self, model, user, pk):
-        if model.objects.filter(user=user, recipe__id=pk).exists():
+        recipe = get_object_or_404(
+            Recipe.objects.with_user_flags(user).only(
+                'id', 'author', 'pub_date'
+            ),
+            id=pk
+        )
+        if getattr(recipe, model.user_flag):
             return Response({'errors': 'Рецепт уже добавлен!'},
                             status=status.HTTP_400_BAD_REQUEST)
-        recipe = get_object_or_404(Recipe, id=pk)
-        model.objects.create(user=user, recipe=recipe)
-        serializer = RecipeSerializerRead(recipe)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        with transaction.atomic():
+            if not model.objects.add(user_id=user.id, recipe_id=recipe.id):
+                return Response({'errors': 'Рецепт уже добавлен!'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if model is ShoppingCart:
+                ShoppingListItem.objects.add_recipes(user.id, [recipe.id])
+        setattr(recipe, model.user_flag, True)
+        return Response(
+            self.get_recipes_data([recipe])[0],
+            status=status.HTTP_201_CREATED
+        )
 
     def delete_from(self, model, user, pk):
-        obj = model.objects.filter(user=user, recipe__id=pk)
-        if obj.exists():
-            obj.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response({'errors': 'Рецепт уже удален!'},
-                        status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            if not model.objects.remove(user_id=user.id, recipe_id=pk):
+                return Response({'errors': 'Рецепт уже удален!'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if model is ShoppingCart:
+                ShoppingListItem.objects.remove_recipes(user.id, [pk])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def apply_batch(self, model, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        user_id = request.user.id
+        add = request.method == 'POST'
+        sign = 1 if add else -1
+        with transaction.atomic():
+            found = set(Recipe.objects.filter(
+                id__in=ids
+            ).values_list('id', flat=True))
+            if add:
+                changed = model.objects.add_many(
+                    'recipe_id', found, user_id=user_id
+                )
+            else:
+                changed = model.objects.remove_many(
+                    'recipe_id', found, user_id=user_id
+                )
+            if changed:
+                Recipe.objects.filter(id__in=changed).update(**{
+                    model.counter_field: counter_shift(
+                        model.counter_field, sign
+                    )
+                })
+                if model is ShoppingCart and add:
+                    ShoppingListItem.objects.add_recipes(user_id, changed)
+                elif model is ShoppingCart:
+                    ShoppingListItem.objects.remove_recipes(user_id, changed)
+        return Response({'results': batch_results(ids, found, changed, add)})
 
 
 @api_view(['GET'])
+@renderer_classes(RENDERERS)
 def download_shopping_cart(request):
-    ingredient_list = "Cписок покупок:"
-    ingredients = RecipeIngredient.objects.filter(
-        recipe__shopping_cart__user=request.user
-    ).values(
-        'ingredient__name', 'ingredient__measurement_unit'
-    ).annotate(ingredient_amount=Sum('amount'))
-    for num, i in enumerate(ingredients):
-        ingredient_list += (
-            f"\n{i['ingredient__name']} - "
-            f"{i['ingredient_amount']} {i['ingredient__measurement_unit']}"
-        )
-        if num < ingredients.count() - 1:
-            ingredient_list += ', '
-    file = 'shopping_list'
-    response = HttpResponse(ingredient_list, 'Content-Type: application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{file}.pdf"'
-    return response
+    return shopping_list_response(
+        get_ingredients(request.user),
+        request.accepted_renderer
+    )
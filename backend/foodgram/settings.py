@@ -21,6 +21,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'djoser',
     'rest_framework',
     'rest_framework.authtoken',
@@ -32,6 +33,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.instrumentation.InstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -72,6 +74,29 @@ DATABASES = {
     }
 }
 
+# Версии данных, журнал изменений рецептов и кеш токенов должны быть
+# общими для всех воркеров gunicorn, поэтому кеш по умолчанию memcached.
+# LocMemCache у каждого процесса свой, с ним приложение не стартует,
+# если явно не разрешить LOCAL_CACHE_ALLOWED для одного процесса.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.memcached.MemcachedCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', '127.0.0.1:11211'),
+    }
+}
+LOCAL_CACHE_ALLOWED = os.getenv('LOCAL_CACHE_ALLOWED', 'False') == 'True'
+
+REFERENCE_CACHE_TIMEOUT = 60 * 60 * 24
+RECIPE_CACHE_TIMEOUT = 60 * 60 * 24
+# Токен и пользователь кешируются в общем кеше, сброс идет через
+# post_save пользователя. QuerySet.update(is_active=False) сигналов не шлет:
+# после него нужно вызвать users.tokens.forget_user_tokens для каждого
+# пользователя, иначе токен работает до TOKEN_CACHE_TIMEOUT.
+TOKEN_CACHE_TIMEOUT = 60 * 5
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -96,7 +121,11 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
@@ -122,5 +151,43 @@ STATICFILES_DIRS_DATA = os.path.join(BASE_DIR, "../data")
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+PDF_FONT_PATH = os.getenv(
+    'PDF_FONT_PATH', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+INGREDIENT_SEARCH_LIMIT = 20
+
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'True') == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'False') == 'True'
+QUERY_BUDGETS = {
+    'GET recipes-list': 8,
+    'GET recipes-detail': 6,
+    'GET recipes-feed': 7,
+    'GET recipes-match': 4,
+    'GET recipes-shopping-list': 3,
+    'POST recipes-list': 20,
+    'PATCH recipes-detail': 25,
+    'recipes-favorite': 10,
+    'recipes-shopping-cart': 12,
+    'subscriptions': 5,
+    'subscribe': 12,
+    'recipes-favorite-batch': 6,
+    'recipes-shopping-cart-batch': 10,
+    'subscribe-batch': 8,
+    'download_shopping_cart': 3,
+    'ingredients-list': 3,
+    'tags-list': 3,
+}
+
+FEED_STRATEGY = os.getenv('FEED_STRATEGY', 'read')
+FEED_BACKFILL = 1000
+FEED_UNION_AUTHORS = 200
+
+BATCH_MAX_ITEMS = 100
 
 EMPTY = '-пусто-'
@@ -1 +1 @@
-# models.py
+default_app_config = 'recipes.apps.RecipesConfig'
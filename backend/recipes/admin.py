@@ -7,7 +7,8 @@ from .models import (
     Recipe,
     RecipeIngredient,
     Favorite,
-    ShoppingCart
+    ShoppingCart,
+    ShoppingListItem
 )
 
 
@@ -17,7 +18,13 @@ class IngredientInline(admin.TabularInline):
 
 
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('author', 'name', 'cooking_time')
+    list_display = (
+        'author',
+        'name',
+        'cooking_time',
+        'favorites_count',
+        'in_carts_count',
+    )
     search_fields = ('name', 'author', 'tags')
     list_filter = ('author', 'name', 'tags')
     inlines = (IngredientInline,)
@@ -74,6 +81,15 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = (
+        'user',
+        'ingredient',
+        'amount',
+    )
+    empty_value_display = '-пусто-'
+
+
 admin.site.register(Follow, FollowAdmin)
 admin.site.register(Tag, TegAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
@@ -81,3 +97,4 @@ admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(RecipeIngredient, IngredientToRecipeAdmin)
 admin.site.register(Favorite, FavoriteAdmin)
 admin.site.register(ShoppingCart, ShoppingCartAdmin)
+admin.site.register(ShoppingListItem, ShoppingListItemAdmin)
@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class RecipesConfig(AppConfig):
     name = 'recipes'
+
+    def ready(self):
+        import recipes.signals  # noqa: F401
+        from recipes.cache import check_shared_cache
+        from recipes.search import install_search
+
+        check_shared_cache()
+        post_migrate.connect(install_search, sender=self)
@@ -0,0 +1,72 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+VERSION_KEY = 'version:{}'
+INGREDIENTS_VERSION = 'ingredients'
+TAGS_VERSION = 'tags'
+RECIPE_VERSION = 'recipe:{}'
+USER_VERSION = 'user:{}'
+LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+def get_version(name):
+    """Текущая версия набора данных name."""
+    version = cache.get(VERSION_KEY.format(name))
+    if version is None:
+        return bump_version(name)
+    return version
+
+
+def get_versions(names):
+    """Версии нескольких наборов данных одним обращением к кешу."""
+    keys = {VERSION_KEY.format(name): name for name in names}
+    versions = {
+        keys[key]: version
+        for key, version in cache.get_many(list(keys)).items()
+    }
+    missing = [name for name in keys.values() if name not in versions]
+    if missing:
+        versions.update(bump_versions(missing))
+    return versions
+
+
+def bump_version(name):
+    """Новая версия набора данных name после его изменения."""
+    version = time.time_ns()
+    cache.set(VERSION_KEY.format(name), version, None)
+    return version
+
+
+def bump_versions(names):
+    """Новые версии сразу нескольких наборов данных."""
+    versions = dict.fromkeys(names, time.time_ns())
+    cache.set_many({
+        VERSION_KEY.format(name): version
+        for name, version in versions.items()
+    }, None)
+    return versions
+
+
+def bump_on_commit(*names):
+    """
+    Сменить версии после фиксации транзакции, чтобы параллельный
+    запрос не закешировал старые данные под новой версией.
+    """
+    transaction.on_commit(lambda: bump_versions(names))
+
+
+def check_shared_cache():
+    """
+    Не запускаться с кешем в памяти процесса: версии и журнал изменений
+    разошлись бы между воркерами, а отозванный токен жил бы в чужом кеше.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in LOCAL_CACHES and not settings.LOCAL_CACHE_ALLOWED:
+        raise ImproperlyConfigured(
+            f'{backend} не общий для процессов, нужен memcached или '
+            'другой общий кеш, либо LOCAL_CACHE_ALLOWED=True'
+        )
@@ -0,0 +1,107 @@
+import io
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image
+
+from recipes.cache import RECIPE_VERSION, bump_versions
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS = {
+    'subscription': (160, 160),
+    'card': (480, 480),
+    'detail': (960, 960),
+}
+FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+RENDITIONS_DIR = 'renditions'
+LAST_RENDITION = ('detail', 'jpeg')
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_WORKERS,
+    thread_name_prefix='renditions'
+)
+
+
+def rendition_name(name, rendition, extension):
+    """Имя уменьшенной копии изображения name в хранилище."""
+    directory, filename = posixpath.split(name)
+    root = posixpath.splitext(filename)[0]
+    return posixpath.join(
+        directory, RENDITIONS_DIR, f'{root}_{rendition}.{extension}'
+    )
+
+
+def make_renditions(name):
+    """Сохранить все уменьшенные копии изображения name."""
+    with default_storage.open(name) as file:
+        image = Image.open(file)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    for rendition, size in RENDITIONS.items():
+        thumbnail = image.copy()
+        thumbnail.thumbnail(size, Image.LANCZOS)
+        for extension, pil_format in FORMATS.items():
+            converted = thumbnail
+            if pil_format == 'JPEG' and thumbnail.mode != 'RGB':
+                converted = thumbnail.convert('RGB')
+            buffer = io.BytesIO()
+            converted.save(buffer, pil_format, quality=82)
+            target = rendition_name(name, rendition, extension)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            default_storage.save(target, ContentFile(buffer.getvalue()))
+
+
+def run_renditions(name):
+    try:
+        make_renditions(name)
+    except Exception:
+        logger.exception('Не удалось подготовить копии %s', name)
+        return
+    try:
+        bump_versions([
+            RECIPE_VERSION.format(id)
+            for id in Recipe.objects.filter(image=name).values_list(
+                'id', flat=True
+            )
+        ])
+    finally:
+        connection.close()
+
+
+def schedule_renditions(name):
+    """Подготовить копии в фоновом потоке после фиксации транзакции."""
+    transaction.on_commit(lambda: executor.submit(run_renditions, name))
+
+
+def rendition_urls(name, request=None):
+    """
+    Ссылки на копии изображения name по размерам и форматам.
+    Пока копии не готовы, возвращает None.
+    """
+    if not name or not default_storage.exists(
+        rendition_name(name, *LAST_RENDITION)
+    ):
+        return None
+    urls = {}
+    for rendition in RENDITIONS:
+        urls[rendition] = {}
+        for extension in FORMATS:
+            url = default_storage.url(
+                rendition_name(name, rendition, extension)
+            )
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[rendition][extension] = url
+    return urls
@@ -0,0 +1,63 @@
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+
+from recipes.cache import INGREDIENTS_VERSION, get_version
+from recipes.models import Ingredient
+
+
+def normalize(value):
+    return value.casefold().replace('ё', 'е')
+
+
+class IngredientPrefixIndex:
+    """
+    Отсортированный по имени список ингредиентов в памяти процесса.
+    Пересобирается, когда меняется версия каталога ингредиентов.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.data = ([], [])
+
+    def build(self):
+        rows = sorted(
+            (normalize(name), id, name, measurement_unit)
+            for id, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            ).order_by()
+        )
+        keys = [row[0] for row in rows]
+        return keys, [
+            {'id': id, 'name': name, 'measurement_unit': measurement_unit}
+            for _, id, name, measurement_unit in rows
+        ]
+
+    def refresh(self):
+        version = get_version(INGREDIENTS_VERSION)
+        if version == self.version:
+            return
+        with self.lock:
+            if version != self.version:
+                self.data = self.build()
+                self.version = version
+
+    def search(self, prefix, limit=None):
+        """Ингредиенты, название которых начинается с prefix."""
+        self.refresh()
+        limit = limit or settings.INGREDIENT_SEARCH_LIMIT
+        prefix = normalize(prefix)
+        keys, rows = self.data
+        start = bisect_left(keys, prefix)
+        end = start + limit
+        result = []
+        for key, row in zip(keys[start:end], rows[start:end]):
+            if not key.startswith(prefix):
+                break
+            result.append(row)
+        return result
+
+
+ingredient_index = IngredientPrefixIndex()
@@ -0,0 +1,179 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.feed import STRATEGIES, get_feed
+from api.pagination import KeysetPagination
+from recipes.models import Recipe, TimelineEntry
+from users.models import Follow, User
+
+BENCH_EMAIL = '@feed-bench.local'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить ленту подписок при чтении и при записи '
+        'на синтетических данных с разной популярностью авторов. '
+        'Данные создаются в транзакции и откатываются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--authors', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=3000)
+        parser.add_argument(
+            '--follows', type=int, default=10,
+            help='Подписок на пользователя'
+        )
+        parser.add_argument(
+            '--skew', type=float, nargs='+', default=[0.0, 1.2],
+            help='Показатели Ципфа для популярности авторов, 0 - равномерно'
+        )
+        parser.add_argument('--pages', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=6)
+        parser.add_argument(
+            '--sample', type=int, default=50,
+            help='Сколько читателей опросить'
+        )
+
+    def seed(self, options, skew):
+        User.objects.bulk_create(
+            User(
+                username=f'feedbench{i}',
+                email=f'feedbench{i}{BENCH_EMAIL}',
+                first_name='bench',
+                last_name='bench',
+                password='!'
+            )
+            for i in range(options['users'])
+        )
+        users = list(User.objects.filter(
+            email__endswith=BENCH_EMAIL
+        ).order_by('id'))
+        authors = users[:options['authors']]
+        weights = [1 / (rank + 1) ** skew for rank in range(len(authors))]
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                name='bench',
+                image='recipes/images/bench.png',
+                text='bench',
+                cooking_time=1
+            )
+            for author in random.choices(
+                authors, weights, k=options['recipes']
+            )
+        )
+        recipes = Recipe.objects.filter(
+            author__email__endswith=BENCH_EMAIL
+        ).only('id')
+        now = timezone.now()
+        for recipe in recipes:
+            recipe.pub_date = now - timedelta(
+                minutes=random.randrange(60 * 24 * 365)
+            )
+        Recipe.objects.bulk_update(recipes, ['pub_date'], batch_size=1000)
+        follows = []
+        for user in users:
+            followed = set()
+            for _ in range(options['follows'] * 10):
+                if len(followed) == options['follows']:
+                    break
+                author = random.choices(authors, weights)[0]
+                if author != user:
+                    followed.add(author)
+            follows.extend(
+                Follow(user=user, author=author) for author in followed
+            )
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        started = time.perf_counter()
+        TimelineEntry.objects.rebuild()
+        self.stdout.write(
+            f'-- лент: {TimelineEntry.objects.count()} строк, '
+            f'заполнение {time.perf_counter() - started:.2f} с'
+        )
+        return users, authors
+
+    def walk(self, user, strategy, options):
+        """Пройти pages страниц ленты, вернуть id и время на страницу."""
+        paginator = KeysetPagination()
+        values, ids, timings = None, [], []
+        for _ in range(options['pages']):
+            started = time.perf_counter()
+            page = get_feed(
+                user, strategy, values, options['page_size'] + 1
+            )
+            page = paginator.get_page(page, options['page_size'])
+            timings.append((time.perf_counter() - started) * 1000)
+            ids.extend(recipe.id for recipe in page)
+            if paginator.next_cursor is None:
+                break
+            values = [page[-1].pub_date.isoformat(), page[-1].id]
+        return ids, timings
+
+    def measure_publish(self, authors):
+        """Время публикации рецепта с раскладкой по лентам."""
+        result = {}
+        counts = {
+            author.id: Follow.objects.filter(author=author).count()
+            for author in authors
+        }
+        by_followers = sorted(authors, key=lambda author: counts[author.id])
+        for label, author in (
+            ('самый популярный автор', by_followers[-1]),
+            ('наименее популярный автор', by_followers[0]),
+        ):
+            started = time.perf_counter()
+            Recipe.objects.create(
+                author=author,
+                name='bench',
+                image='recipes/images/bench.png',
+                text='bench',
+                cooking_time=1
+            )
+            result[label] = (
+                counts[author.id], (time.perf_counter() - started) * 1000
+            )
+        return result
+
+    def run(self, options, skew):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Ципф {skew}'))
+        users, authors = self.seed(options, skew)
+        readers = random.sample(users, min(options['sample'], len(users)))
+        timings = {strategy: [] for strategy in STRATEGIES}
+        mismatches = 0
+        for reader in readers:
+            results = {
+                strategy: self.walk(reader, strategy, options)
+                for strategy in STRATEGIES
+            }
+            for strategy, (_, page_timings) in results.items():
+                timings[strategy].extend(page_timings)
+            if len({tuple(ids) for ids, _ in results.values()}) > 1:
+                mismatches += 1
+        for strategy, values in timings.items():
+            self.stdout.write(
+                f'-- {strategy}: медиана {statistics.median(values):.2f} мс, '
+                f'максимум {max(values):.2f} мс на страницу'
+            )
+        if mismatches:
+            self.stdout.write(self.style.WARNING(
+                f'-- ленты различаются у {mismatches} читателей '
+                f'(см. FEED_BACKFILL)'
+            ))
+        for label, (followers, ms) in self.measure_publish(authors).items():
+            self.stdout.write(
+                f'-- публикация, {label} ({followers} подписчиков): '
+                f'{ms:.2f} мс'
+            )
+
+    def handle(self, *args, **options):
+        for skew in options['skew']:
+            with transaction.atomic():
+                self.run(options, skew)
+                transaction.set_rollback(True)
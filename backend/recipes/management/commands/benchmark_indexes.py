@@ -0,0 +1,170 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import (
+    Favorite,
+    Recipe,
+    RecipeTag,
+    ShoppingCart,
+    Tag
+)
+from users.models import Follow, User
+
+BENCH_EMAIL = '@bench.local'
+
+SEED_SQL = (
+    """
+    INSERT INTO {user} (password, is_superuser, username, first_name,
+        last_name, email, is_staff, is_active, date_joined,
+        recipes_count, followers_count)
+    SELECT '!', false, 'bench' || i, 'bench', 'bench',
+        'bench' || i || '{email}', false, true, now(), 0, 0
+    FROM generate_series(1, %(users)s) i
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO {recipe} (author_id, name, image, text, cooking_time,
+        pub_date, favorites_count, in_carts_count)
+    SELECT u.ids[1 + i %% array_length(u.ids, 1)], 'bench ' || i,
+        'recipes/images/bench.png', 'bench', 1 + i %% 120,
+        now() - i * interval '1 minute', 0, 0
+    FROM generate_series(1, %(recipes)s) i,
+        (SELECT array_agg(id) ids FROM {user}
+         WHERE email LIKE '%%{email}') u
+    """,
+    """
+    INSERT INTO {recipetag} (recipe_id, tag_id)
+    SELECT r.id, t.ids[1 + r.id %% array_length(t.ids, 1)]
+    FROM {recipe} r, (SELECT array_agg(id) ids FROM {tag}) t
+    WHERE r.name LIKE 'bench %%' AND t.ids IS NOT NULL
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO {favorite} (user_id, recipe_id)
+    SELECT u.ids[1 + i %% array_length(u.ids, 1)],
+        r.low + (i * 7919) %% (r.high - r.low + 1)
+    FROM generate_series(1, %(favorites)s) i,
+        (SELECT array_agg(id) ids FROM {user}
+         WHERE email LIKE '%%{email}') u,
+        (SELECT min(id) low, max(id) high FROM {recipe}
+         WHERE name LIKE 'bench %%') r
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO {shoppingcart} (user_id, recipe_id)
+    SELECT u.ids[1 + i %% array_length(u.ids, 1)],
+        r.low + (i * 104729) %% (r.high - r.low + 1)
+    FROM generate_series(1, %(favorites)s) i,
+        (SELECT array_agg(id) ids FROM {user}
+         WHERE email LIKE '%%{email}') u,
+        (SELECT min(id) low, max(id) high FROM {recipe}
+         WHERE name LIKE 'bench %%') r
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO {follow} (user_id, author_id)
+    SELECT u.ids[1 + i %% array_length(u.ids, 1)],
+        u.ids[1 + (i * 31) %% array_length(u.ids, 1)]
+    FROM generate_series(1, %(follows)s) i,
+        (SELECT array_agg(id) ids FROM {user}
+         WHERE email LIKE '%%{email}') u
+    WHERE i %% array_length(u.ids, 1) <> (i * 31) %% array_length(u.ids, 1)
+    ON CONFLICT DO NOTHING
+    """,
+)
+
+INDEXED_MODELS = (Recipe, RecipeTag, Favorite, ShoppingCart, Follow)
+
+
+class Command(BaseCommand):
+    help = (
+        'Планы EXPLAIN и задержка основных выборок '
+        'без составных индексов и с ними (только PostgreSQL)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', action='store_true',
+            help='Сгенерировать синтетические данные перед замером'
+        )
+        parser.add_argument('--recipes', type=int, default=1_000_000)
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--favorites', type=int, default=2_000_000)
+        parser.add_argument('--follows', type=int, default=200_000)
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Число повторов каждой выборки'
+        )
+
+    def seed(self, options):
+        tables = {
+            model._meta.model_name: model._meta.db_table
+            for model in (User, Tag, *INDEXED_MODELS)
+        }
+        with transaction.atomic(), connection.cursor() as cursor:
+            for sql in SEED_SQL:
+                cursor.execute(
+                    sql.format(email=BENCH_EMAIL, **tables), options
+                )
+            for table in tables.values():
+                cursor.execute(f'ANALYZE {table}')
+        self.stdout.write(self.style.SUCCESS('Данные сгенерированы'))
+
+    def get_queries(self):
+        author = Recipe.objects.values_list(
+            'author', flat=True).order_by('-author__recipes_count').first()
+        recipe = Recipe.objects.values_list(
+            'id', flat=True).order_by('-favorites_count').first()
+        tag = Tag.objects.values_list('id', flat=True).first()
+        return {
+            'Рецепты автора по дате': Recipe.objects.filter(
+                author=author).order_by('-pub_date')[:6],
+            'Кто добавил рецепт в избранное': Favorite.objects.filter(
+                recipe=recipe).values('user'),
+            'Чьи списки покупок содержат рецепт': ShoppingCart.objects.filter(
+                recipe=recipe).values('user'),
+            'Рецепты с тегом': RecipeTag.objects.filter(
+                tag=tag).values('recipe')[:6],
+            'Подписчики автора': Follow.objects.filter(
+                author=author).values('user'),
+        }
+
+    def measure(self, queries, repeat):
+        result = {}
+        for name, queryset in queries.items():
+            plan = queryset.explain(analyze=True)
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            result[name] = (plan, statistics.median(timings))
+        return result
+
+    def drop_indexes(self):
+        with connection.cursor() as cursor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    cursor.execute(f'DROP INDEX IF EXISTS {index.name}')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Замер доступен только для PostgreSQL')
+        if options['seed']:
+            self.seed(options)
+        queries = self.get_queries()
+        with transaction.atomic():
+            self.drop_indexes()
+            before = self.measure(queries, options['repeat'])
+            transaction.set_rollback(True)
+        after = self.measure(queries, options['repeat'])
+        for name in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, (plan, median) in (
+                ('без индексов', before[name]), ('с индексами', after[name])
+            ):
+                self.stdout.write(f'-- {label}: медиана {median:.2f} мс')
+                self.stdout.write(plan)
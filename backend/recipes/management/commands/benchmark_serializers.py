@@ -0,0 +1,96 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import ORJSONRenderer
+from api.representations import recipe_bodies
+from api.serializers import IngredientSerializer, RecipeSerializerRead
+from recipes.models import Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Скорость сериализации рецептов и ингредиентов: DRF с JSONRenderer '
+        'против values() с ORJSONRenderer, с проверкой совпадения байтов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=1000,
+            help='Сколько рецептов из базы сериализовать'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=10,
+            help='Число повторов каждого замера'
+        )
+        parser.add_argument(
+            '--host', default='localhost',
+            help='Хост из ALLOWED_HOSTS для абсолютных ссылок на картинки'
+        )
+
+    def measure(self, render, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = render()
+            timings.append(time.perf_counter() - started)
+        return output, statistics.median(timings)
+
+    def get_cases(self, request, ids):
+        def drf_recipes():
+            recipes = Recipe.objects.for_read(request.user).in_bulk(ids)
+            return JSONRenderer().render(RecipeSerializerRead(
+                [recipes[id] for id in ids],
+                many=True,
+                context={'request': request}
+            ).data)
+
+        def lean_recipes():
+            bodies = recipe_bodies(ids, request)
+            return ORJSONRenderer().render([bodies[id] for id in ids])
+
+        def drf_ingredients():
+            return JSONRenderer().render(IngredientSerializer(
+                Ingredient.objects.all(), many=True
+            ).data)
+
+        def lean_ingredients():
+            return ORJSONRenderer().render(list(
+                Ingredient.objects.values(*IngredientSerializer.Meta.fields)
+            ))
+
+        return {
+            'Рецепты': (drf_recipes, lean_recipes, len(ids)),
+            'Ингредиенты': (
+                drf_ingredients, lean_ingredients, Ingredient.objects.count()
+            ),
+        }
+
+    def handle(self, *args, **options):
+        ids = list(Recipe.objects.values_list(
+            'id', flat=True
+        ).order_by('-pub_date', '-id')[:options['recipes']])
+        if not ids:
+            raise CommandError('В базе нет рецептов')
+        request = Request(APIRequestFactory(
+            SERVER_NAME=options['host']
+        ).get('/api/recipes/'))
+        for name, (drf, lean, count) in self.get_cases(request, ids).items():
+            expected, drf_time = self.measure(drf, options['repeat'])
+            output, lean_time = self.measure(lean, options['repeat'])
+            if output != expected:
+                raise CommandError(f'{name}: вывод отличается от DRF')
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{name}: {count} шт., вывод совпадает'
+            ))
+            for label, median in (('DRF', drf_time), ('values', lean_time)):
+                self.stdout.write(
+                    f'-- {label}: медиана {median * 1000:.2f} мс, '
+                    f'{median * 1000 / count * 1000:.2f} мс на 1000, '
+                    f'{count / median:.0f} в секунду'
+                )
+            self.stdout.write(f'-- ускорение x{drf_time / lean_time:.1f}')
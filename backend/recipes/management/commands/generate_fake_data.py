@@ -0,0 +1,248 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from recipes.cache import INGREDIENTS_VERSION, TAGS_VERSION, bump_version
+from recipes.management.commands.import_test_data import batches
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    ShoppingCart,
+    Tag
+)
+from users.models import Follow, User
+
+FAKE_EMAIL = '@fake.foodgram.local'
+FAKE_TAG = 'fake-'
+FAKE_PASSWORD = 'fake-password'
+WORDS = (
+    'курица', 'говядина', 'рис', 'гречка', 'суп', 'салат', 'пирог',
+    'соус', 'омлет', 'паста', 'рагу', 'каша', 'блины', 'котлеты',
+    'запеканка', 'плов', 'борщ', 'сырники', 'шарлотка', 'овощи',
+)
+UNITS = ('г', 'кг', 'мл', 'л', 'шт', 'ст. л.', 'ч. л.', 'по вкусу')
+DEFAULTS = {
+    'users': 1000,
+    'recipes': 10000,
+    'ingredients': 2000,
+    'favorites': 50000,
+    'carts': 10000,
+    'follows': 20000,
+}
+
+
+class Zipf:
+    """Выбор элементов с вероятностью, убывающей по степени ранга."""
+
+    def __init__(self, items, skew):
+        self.items = list(items)
+        self.cum_weights = list(accumulate(
+            1 / (rank + 1) ** skew for rank in range(len(self.items))
+        ))
+
+    def choice(self):
+        return random.choices(self.items, cum_weights=self.cum_weights)[0]
+
+    def sample(self, k):
+        """До k разных элементов."""
+        chosen = set()
+        for _ in range(k * 10):
+            if len(chosen) >= k:
+                break
+            chosen.add(self.choice())
+        return chosen
+
+
+class Command(BaseCommand):
+    help = (
+        'Сгенерировать синтетических пользователей, рецепты, избранное, '
+        'списки покупок и подписки с распределением Ципфа '
+        'для нагрузочных замеров'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=float, default=1.0,
+            help='Множитель для всех объемов'
+        )
+        for name, default in DEFAULTS.items():
+            parser.add_argument(f'--{name}', type=int, default=default)
+        parser.add_argument('--tags', type=int, default=12)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель Ципфа, 0 - равномерное распределение'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить ранее сгенерированные данные перед генерацией'
+        )
+
+    def report(self, label, started, count):
+        self.stdout.write(
+            f'{label}: {count} за {time.perf_counter() - started:.1f} с'
+        )
+
+    def bulk(self, model, objects, **kwargs):
+        count = 0
+        for batch in batches(objects, self.batch_size):
+            model.objects.bulk_create(batch, **kwargs)
+            count += len(batch)
+        return count
+
+    def clear(self):
+        User.objects.filter(email__endswith=FAKE_EMAIL).delete()
+        Tag.objects.filter(slug__startswith=FAKE_TAG).delete()
+
+    def make_users(self, count):
+        started = time.perf_counter()
+        password = make_password(FAKE_PASSWORD)
+        offset = User.objects.filter(email__endswith=FAKE_EMAIL).count()
+        self.bulk(User, (
+            User(
+                username=f'fake{offset + i}',
+                email=f'fake{offset + i}{FAKE_EMAIL}',
+                first_name=random.choice(('Анна', 'Иван', 'Олег', 'Мария')),
+                last_name=random.choice(('Петрова', 'Смирнов', 'Орлова')),
+                password=password
+            )
+            for i in range(count)
+        ))
+        self.report('Пользователи', started, count)
+        return list(User.objects.filter(
+            email__endswith=FAKE_EMAIL
+        ).values_list('id', flat=True).order_by('id'))
+
+    def make_tags(self, count):
+        offset = Tag.objects.filter(slug__startswith=FAKE_TAG).count()
+        self.bulk(Tag, (
+            Tag(
+                name=f'Тег {offset + i}',
+                color=f'#{random.randrange(16 ** 6):06X}',
+                slug=f'{FAKE_TAG}{offset + i}'
+            )
+            for i in range(count)
+        ), ignore_conflicts=True)
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def make_ingredients(self, count):
+        ingredients = list(Ingredient.objects.values_list('id', flat=True))
+        if ingredients:
+            return ingredients
+        self.bulk(Ingredient, (
+            Ingredient(
+                name=f'{random.choice(WORDS)} {i}',
+                measurement_unit=random.choice(UNITS)
+            )
+            for i in range(count)
+        ))
+        return list(Ingredient.objects.values_list('id', flat=True))
+
+    def make_recipes(self, count, authors, tags, ingredients):
+        started = time.perf_counter()
+        last_id = Recipe.objects.order_by('-id').values_list(
+            'id', flat=True).first() or 0
+        self.bulk(Recipe, (
+            Recipe(
+                author_id=authors.choice(),
+                name=' '.join(random.sample(WORDS, 2)).capitalize(),
+                image='recipes/images/fake.png',
+                text=' '.join(random.choices(WORDS, k=30)),
+                cooking_time=random.randint(5, 180)
+            )
+            for _ in range(count)
+        ))
+        recipes = list(Recipe.objects.filter(
+            id__gt=last_id, author__email__endswith=FAKE_EMAIL
+        ).only('id'))
+        now = timezone.now()
+        for recipe in recipes:
+            recipe.pub_date = now - timedelta(
+                minutes=random.randrange(60 * 24 * 365 * 2)
+            )
+        Recipe.objects.bulk_update(
+            recipes, ['pub_date'], batch_size=self.batch_size
+        )
+        ids = [recipe.id for recipe in recipes]
+        self.bulk(RecipeTag, (
+            RecipeTag(recipe_id=recipe, tag_id=tag)
+            for recipe in ids
+            for tag in tags.sample(random.randint(1, 3))
+        ))
+        self.bulk(RecipeIngredient, (
+            RecipeIngredient(
+                recipe_id=recipe,
+                ingredient_id=ingredient,
+                amount=random.randint(1, 500)
+            )
+            for recipe in ids
+            for ingredient in ingredients.sample(random.randint(3, 12))
+        ))
+        self.report('Рецепты', started, len(ids))
+        return ids
+
+    def make_pairs(
+        self, label, model, count, users, targets, field, skip_self=False
+    ):
+        """До count пар пользователь-цель, skip_self - без пар с собой."""
+        started = time.perf_counter()
+        pairs = set()
+        for _ in range(count * 2):
+            if len(pairs) >= count:
+                break
+            user, target = users.choice(), targets.choice()
+            if not (skip_self and user == target):
+                pairs.add((user, target))
+        self.bulk(model, (
+            model(user_id=user, **{f'{field}_id': target})
+            for user, target in pairs
+        ), ignore_conflicts=True)
+        self.report(label, started, len(pairs))
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.batch_size = options['batch_size']
+        scale, skew = options['scale'], options['skew']
+        count = {name: int(options[name] * scale) for name in DEFAULTS}
+        with transaction.atomic():
+            if options['clear']:
+                self.clear()
+            users = self.make_users(count['users'])
+            authors = Zipf(random.sample(users, len(users)), skew)
+            tags = Zipf(self.make_tags(options['tags']), skew)
+            ingredients = Zipf(
+                self.make_ingredients(count['ingredients']), skew
+            )
+            recipes = Zipf(self.make_recipes(
+                count['recipes'], authors, tags, ingredients
+            ), skew)
+            readers = Zipf(users, 0)
+            self.make_pairs(
+                'Избранное', Favorite, count['favorites'],
+                readers, recipes, 'recipe'
+            )
+            self.make_pairs(
+                'Списки покупок', ShoppingCart, count['carts'],
+                readers, recipes, 'recipe'
+            )
+            self.make_pairs(
+                'Подписки', Follow, count['follows'],
+                readers, authors, 'author', skip_self=True
+            )
+            call_command('recount_counters', stdout=self.stdout)
+        bump_version(INGREDIENTS_VERSION)
+        bump_version(TAGS_VERSION)
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные сгенерированы, пароль пользователей: {FAKE_PASSWORD}'
+        ))
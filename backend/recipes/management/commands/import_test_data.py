@@ -1,25 +1,167 @@
+import csv
+import io
 import json
+import time
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
+from recipes.cache import INGREDIENTS_VERSION, TAGS_VERSION, bump_version
 from recipes.models import Ingredient, Tag
 
+INGREDIENT_FIELDS = ('name', 'measurement_unit')
+
+
+def unfinished_array(rest, started):
+    """Ошибка для файла, кончившегося раньше закрывающей скобки."""
+    rest = rest.strip(' \t\r\n,')
+    if not started:
+        return CommandError('Ожидался JSON-массив')
+    if rest:
+        return CommandError(f'Некорректный JSON в конце файла: {rest[:80]!r}')
+    return CommandError('JSON-массив не закрыт: нет "]"')
+
+
+def iter_json_array(file, chunk_size=64 * 1024):
+    """
+    Объекты JSON-массива из файла без чтения файла целиком.
+    Оборванный или испорченный массив - CommandError, а не тихий конец.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    for chunk in iter(lambda: file.read(chunk_size), ''):
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != '[':
+                    raise CommandError('Ожидался JSON-массив')
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                obj, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            yield obj
+    raise unfinished_array(buffer[position:], started)
+
+
+def iter_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield dict(zip(INGREDIENT_FIELDS, row))
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    batch = list(islice(rows, size))
+    while batch:
+        yield batch
+        batch = list(islice(rows, size))
+
 
 class Command(BaseCommand):
     help = ' Загрузить данные в модель ингредиентов '
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ingredients', default='data/ingredients.json',
+            help='Файл ингредиентов (.json или .csv)'
+        )
+        parser.add_argument(
+            '--tags', default='data/tags.json',
+            help='Файл тегов (.json)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Размер пачки для вставки'
+        )
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Загрузить ингредиенты через COPY (только PostgreSQL)'
+        )
+
+    def read(self, file):
+        if file.name.endswith('.csv'):
+            return iter_csv(file)
+        return iter_json_array(file)
+
+    def progress(self, label, count, started):
+        rate = count / max(time.monotonic() - started, 1e-9)
+        self.stdout.write(f'{label}: {count} строк, {rate:.0f} строк/с')
+
+    def bulk_load(self, model, rows, batch_size, label):
+        started = time.monotonic()
+        count = 0
+        with transaction.atomic():
+            for batch in batches(rows, batch_size):
+                model.objects.bulk_create(
+                    [model(**row) for row in batch],
+                    ignore_conflicts=True
+                )
+                count += len(batch)
+                self.progress(label, count, started)
+        return count
+
+    def copy_load(self, rows, batch_size, label):
+        if connection.vendor != 'postgresql':
+            raise CommandError('--copy доступен только для PostgreSQL')
+        started = time.monotonic()
+        count = 0
+        table = Ingredient._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE import_ingredient '
+                '(name varchar(200), measurement_unit varchar(200)) '
+                'ON COMMIT DROP'
+            )
+            for batch in batches(rows, batch_size):
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row in batch:
+                    writer.writerow(
+                        [row[field] for field in INGREDIENT_FIELDS]
+                    )
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY import_ingredient (name, measurement_unit) '
+                    'FROM STDIN WITH (FORMAT csv)',
+                    buffer
+                )
+                count += len(batch)
+                self.progress(label, count, started)
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM import_ingredient ON CONFLICT DO NOTHING'
+            )
+        return count
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.WARNING('Старт команды'))
-        with open('data/ingredients.json', encoding='utf-8',
+        batch_size = options['batch_size']
+        with open(options['ingredients'], encoding='utf-8',
                   ) as data_file_ingredients:
-            ingredient_data = json.loads(data_file_ingredients.read())
-            for ingredients in ingredient_data:
-                Ingredient.objects.get_or_create(**ingredients)
+            rows = self.read(data_file_ingredients)
+            if options['copy']:
+                self.copy_load(rows, batch_size, 'Ингредиенты')
+            else:
+                self.bulk_load(Ingredient, rows, batch_size, 'Ингредиенты')
+        bump_version(INGREDIENTS_VERSION)
 
-        with open('data/tags.json', encoding='utf-8',
+        with open(options['tags'], encoding='utf-8',
                   ) as data_file_tags:
-            tags_data = json.loads(data_file_tags.read())
-            for tags in tags_data:
-                Tag.objects.get_or_create(**tags)
+            self.bulk_load(
+                Tag, iter_json_array(data_file_tags), batch_size, 'Теги'
+            )
+        bump_version(TAGS_VERSION)
 
         self.stdout.write(self.style.SUCCESS('Данные загружены'))
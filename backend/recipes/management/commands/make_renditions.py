@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import make_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Подготовить уменьшенные копии изображений всех рецептов'
+
+    def handle(self, *args, **options):
+        names = Recipe.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct()
+        for count, name in enumerate(names.iterator(), start=1):
+            make_renditions(name)
+            if count % 100 == 0:
+                self.stdout.write(f'Обработано изображений: {count}')
+        self.stdout.write(self.style.SUCCESS('Копии изображений готовы'))
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import (
+    Favorite,
+    Recipe,
+    ShoppingCart,
+    ShoppingListItem,
+    TimelineEntry
+)
+from users.models import Follow, User
+
+
+def count_of(model, field):
+    """Подзапрос с числом строк model, ссылающихся на OuterRef('pk')."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                count=Count('pk')
+            ).values('count'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитать счетчики избранного, покупок, рецептов и подписчиков '
+        'и сводные списки покупок и ленты подписок'
+    )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.update(
+            favorites_count=count_of(Favorite, 'recipe'),
+            in_carts_count=count_of(ShoppingCart, 'recipe'),
+        )
+        users = User.objects.update(
+            recipes_count=count_of(Recipe, 'author'),
+            followers_count=count_of(Follow, 'author'),
+        )
+        ShoppingListItem.objects.rebuild()
+        TimelineEntry.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счетчики пересчитаны: рецептов {recipes}, '
+            f'пользователей {users}'
+        ))
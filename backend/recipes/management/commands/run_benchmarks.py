@@ -0,0 +1,348 @@
+import base64
+import io
+import json
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from itertools import combinations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.test import override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.instrumentation import QueryStats
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag
+)
+from users.models import Follow, User
+
+RECIPE_FILTERS = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+                  'search')
+
+
+def percentile(values, percent):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[
+        percent - 1
+    ]
+
+
+def image_data():
+    buffer = io.BytesIO()
+    Image.new('RGB', (600, 400), 'orange').save(buffer, 'JPEG')
+    return 'data:image/jpeg;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогнать сценарии API в процессе и сохранить p50/p95/p99 '
+        'и число SQL-запросов на запрос в JSON для сравнения между коммитами'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--viewers', type=int, default=10,
+            help='Сколько пользователей по очереди выполняют запросы'
+        )
+        parser.add_argument(
+            '--scenario', nargs='+',
+            help='Запустить только сценарии с этими префиксами'
+        )
+        parser.add_argument('--host', default='localhost')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Сохранить отчет в JSON')
+        parser.add_argument(
+            '--compare', help='Отчет JSON, с которым сравнить результат'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=10.0,
+            help='Рост p95 в процентах, который считается регрессией'
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help='Завершиться с ошибкой при регрессии'
+        )
+
+    def get_viewers(self, count):
+        users = list(User.objects.annotate(**{
+            model._meta.model_name: Exists(
+                model.objects.filter(user=OuterRef('pk'))
+            )
+            for model in (Favorite, ShoppingCart, Follow)
+        }).filter(
+            favorite=True, shoppingcart=True, follow=True
+        ).values_list('id', flat=True).order_by('id')[:count])
+        if not users:
+            raise CommandError(
+                'Нет пользователей с избранным, подписками и покупками, '
+                'запустите generate_fake_data'
+            )
+        return [
+            Token.objects.get_or_create(user_id=user)[0]
+            for user in users
+        ]
+
+    def recipe_filters(self):
+        tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        author = Recipe.objects.values_list(
+            'author', flat=True
+        ).order_by('-author__recipes_count').first()
+        word = Recipe.objects.values_list('name', flat=True).first()
+        params = {
+            'tags': [('tags', slug) for slug in tags],
+            'author': [('author', author)],
+            'is_favorited': [('is_favorited', 1)],
+            'is_in_shopping_cart': [('is_in_shopping_cart', 1)],
+            'search': [('search', word.split()[0])],
+        }
+        scenarios = {'recipes': []}
+        for size in range(1, len(RECIPE_FILTERS) + 1):
+            for names in combinations(RECIPE_FILTERS, size):
+                query = [pair for name in names for pair in params[name]]
+                scenarios['recipes?' + '+'.join(names)] = query
+                if 'tags' in names:
+                    scenarios['recipes?' + '+'.join(names) + '+all'] = (
+                        query + [('tags_mode', 'all')]
+                    )
+        return scenarios
+
+    def get_scenarios(self):
+        """
+        Сценарии: имя -> (метод, функция(итерация) -> url, данные).
+        Данные могут быть функцией клиента, если зависят от пользователя.
+        """
+        scenarios = {}
+        for name, query in self.recipe_filters().items():
+            url = '/api/recipes/?' + '&'.join(
+                f'{key}={value}' for key, value in query
+            )
+            scenarios[name] = ('get', lambda i, url=url: url, None)
+        recipe_ids = list(Recipe.objects.values_list(
+            'id', flat=True
+        ).order_by('-favorites_count')[:100])
+        names = list(Ingredient.objects.values_list(
+            'name', flat=True
+        ).order_by('?')[:100])
+        ingredients = list(Ingredient.objects.values_list(
+            'id', flat=True
+        )[:5])
+        tags = list(Tag.objects.values_list('id', flat=True)[:2])
+        authors = list(User.objects.values_list(
+            'id', flat=True
+        ).order_by('-recipes_count')[:20])
+        recipe = {
+            'ingredients': [
+                {'id': id, 'amount': 10} for id in ingredients
+            ],
+            'tags': tags,
+            'image': image_data(),
+            'name': 'Замер',
+            'text': 'Рецепт для замера',
+            'cooking_time': 15,
+        }
+        scenarios.update({
+            'recipes?page=5': ('get', lambda i: '/api/recipes/?page=5', None),
+            'recipes?cursor': (
+                'get', lambda i: '/api/recipes/?cursor=&limit=6', None
+            ),
+            'recipe-detail': (
+                'get',
+                lambda i: f'/api/recipes/{recipe_ids[i % len(recipe_ids)]}/',
+                None
+            ),
+            'feed?strategy=read': (
+                'get', lambda i: '/api/recipes/feed/?strategy=read', None
+            ),
+            'feed?strategy=write': (
+                'get', lambda i: '/api/recipes/feed/?strategy=write', None
+            ),
+            'subscriptions': (
+                'get',
+                lambda i: '/api/users/subscriptions/?recipes_limit=3',
+                None
+            ),
+            'ingredients?name=': (
+                'get',
+                lambda i: '/api/ingredients/?name='
+                + names[i % len(names)][:2],
+                None
+            ),
+            'download_shopping_cart': (
+                'get', lambda i: '/api/recipes/download_shopping_cart/', None
+            ),
+            'download_shopping_cart?format=pdf': (
+                'get',
+                lambda i: '/api/recipes/download_shopping_cart/?format=pdf',
+                None
+            ),
+            'shopping_cart-batch': (
+                'post',
+                lambda i: '/api/recipes/shopping_cart/',
+                {'ids': recipe_ids[:50]}
+            ),
+            'subscribe-batch': (
+                'post',
+                lambda i: '/api/users/subscribe/',
+                lambda client: {'ids': [
+                    id for id in authors if id != client.user_id
+                ]}
+            ),
+            'recipe-create': ('post', lambda i: '/api/recipes/', recipe),
+            'recipe-update': ('patch', None, recipe),
+        })
+        return scenarios
+
+    def request(self, client, method, url, data):
+        """Выполнить запрос, вернуть статус, время и число запросов."""
+        stats = QueryStats()
+        started = time.perf_counter()
+        with stats.capture():
+            response = getattr(client, method)(url, data, format='json')
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+        return (
+            response.status_code,
+            (time.perf_counter() - started) * 1000,
+            stats.count
+        )
+
+    def own_recipe_url(self, client, data):
+        response = client.post('/api/recipes/', data, format='json')
+        return f'/api/recipes/{response.json()["id"]}/'
+
+    def run_scenario(self, name, clients, method, url, data, options):
+        """
+        Замер сценария. Ответ не 2xx, в том числе на прогреве, валит
+        сценарий: дешевые ошибки не должны попадать в перцентили.
+        """
+        timings, queries, statuses = [], [], Counter()
+        total = options['warmup'] + options['iterations']
+        for iteration in range(total):
+            client = clients[iteration % len(clients)]
+            payload = data(client) if callable(data) else data
+            with transaction.atomic():
+                target = (
+                    url(iteration) if url is not None
+                    else self.own_recipe_url(client, payload)
+                )
+                status, elapsed, count = self.request(
+                    client, method, target, payload
+                )
+                if method != 'get':
+                    transaction.set_rollback(True)
+            if not 200 <= status < 300:
+                raise CommandError(
+                    f'{name}: {method.upper()} {target} вернул {status}'
+                )
+            if iteration < options['warmup']:
+                continue
+            timings.append(elapsed)
+            queries.append(count)
+            statuses[status] += 1
+        return {
+            'requests': len(timings),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'queries_mean': round(statistics.mean(queries), 2),
+            'queries_max': max(queries),
+            'statuses': {str(code): n for code, n in statuses.items()},
+        }
+
+    def get_meta(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'recipes': Recipe.objects.count(),
+            'recipe_ingredients': RecipeIngredient.objects.count(),
+            'favorites': Favorite.objects.count(),
+            'follows': Follow.objects.count(),
+        }
+
+    def print_report(self, results, baseline, threshold):
+        regressions = []
+        width = max(map(len, results), default=0) + 2
+        self.stdout.write(
+            f'{"сценарий":<{width}}{"p50":>9}{"p95":>9}{"p99":>9}{"SQL":>7}'
+        )
+        for name, result in results.items():
+            line = (
+                f'{name:<{width}}{result["p50_ms"]:>9.2f}'
+                f'{result["p95_ms"]:>9.2f}{result["p99_ms"]:>9.2f}'
+                f'{result["queries_mean"]:>7.1f}'
+            )
+            old = baseline.get(name)
+            if old:
+                change = (result['p95_ms'] / old['p95_ms'] - 1) * 100
+                queries = result['queries_mean'] - old['queries_mean']
+                line += f'  p95 {change:+.1f}%  SQL {queries:+.1f}'
+                if change > threshold or queries > 0:
+                    regressions.append(name)
+                    line = self.style.ERROR(line)
+            self.stdout.write(line)
+        return regressions
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        clients = []
+        for token in self.get_viewers(options['viewers']):
+            client = APIClient(SERVER_NAME=options['host'])
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+            client.user_id = token.user_id
+            clients.append(client)
+        scenarios = self.get_scenarios()
+        if options['scenario']:
+            scenarios = {
+                name: scenario for name, scenario in scenarios.items()
+                if name.startswith(tuple(options['scenario']))
+            }
+        results = {}
+        with tempfile.TemporaryDirectory() as media, override_settings(
+            MEDIA_ROOT=media
+        ):
+            for name, (method, url, data) in scenarios.items():
+                results[name] = self.run_scenario(
+                    name, clients, method, url, data, options
+                )
+        report = {'meta': self.get_meta(options), 'scenarios': results}
+        baseline = {}
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)['scenarios']
+        regressions = self.print_report(
+            results, baseline, options['threshold']
+        )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f'Регрессии: {", ".join(regressions)}')
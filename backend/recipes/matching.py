@@ -0,0 +1,119 @@
+import heapq
+import threading
+from array import array
+from bisect import insort
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from recipes.models import RecipeIngredient
+
+SEQ_KEY = 'matching:seq'
+CHANGE_KEY = 'matching:change:{}'
+CHANGE_TIMEOUT = 60 * 60 * 24
+MAX_REPLAY = 1000
+
+
+def current_seq():
+    cache.add(SEQ_KEY, 0, None)
+    return cache.get(SEQ_KEY) or 0
+
+
+def recipe_changed(recipe_id):
+    """Отметить смену ингредиентов рецепта для индексов всех процессов."""
+    def publish():
+        current_seq()
+        seq = cache.incr(SEQ_KEY)
+        cache.set(CHANGE_KEY.format(seq), recipe_id, CHANGE_TIMEOUT)
+    transaction.on_commit(publish)
+
+
+class IngredientMatchIndex:
+    """
+    Инвертированный индекс ингредиент -> рецепты в памяти процесса.
+    Изменения рецептов подтягиваются по журналу в кеше, при пропусках
+    в журнале индекс строится заново.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seq = None
+        self.postings = {}
+        self.recipes = {}
+
+    def build(self):
+        postings = defaultdict(lambda: array('I'))
+        recipes = defaultdict(lambda: array('I'))
+        for recipe_id, ingredient_id in RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).order_by('ingredient_id', 'recipe_id').iterator():
+            postings[ingredient_id].append(recipe_id)
+            recipes[recipe_id].append(ingredient_id)
+        self.postings = dict(postings)
+        self.recipes = dict(recipes)
+
+    def update_recipes(self, recipe_ids):
+        fresh = defaultdict(lambda: array('I'))
+        for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id').order_by('ingredient_id'):
+            fresh[recipe_id].append(ingredient_id)
+        for recipe_id in recipe_ids:
+            for ingredient_id in self.recipes.pop(recipe_id, ()):
+                posting = self.postings[ingredient_id]
+                posting.remove(recipe_id)
+                if not posting:
+                    del self.postings[ingredient_id]
+            if recipe_id in fresh:
+                self.recipes[recipe_id] = fresh[recipe_id]
+                for ingredient_id in fresh[recipe_id]:
+                    insort(
+                        self.postings.setdefault(ingredient_id, array('I')),
+                        recipe_id
+                    )
+
+    def refresh(self):
+        seq = current_seq()
+        if seq == self.seq:
+            return
+        if self.seq is None or not 0 < seq - self.seq <= MAX_REPLAY:
+            self.build()
+            self.seq = seq
+            return
+        changes = cache.get_many(
+            [CHANGE_KEY.format(number)
+             for number in range(self.seq + 1, seq + 1)]
+        )
+        if len(changes) < seq - self.seq:
+            self.build()
+        else:
+            self.update_recipes(set(changes.values()))
+        self.seq = seq
+
+    def match(self, ingredient_ids, limit):
+        """
+        Рецепты по доле ингредиентов, которые есть у пользователя.
+        Возвращает (recipe_id, доля, недостающие ингредиенты).
+        """
+        have = set(ingredient_ids)
+        with self.lock:
+            self.refresh()
+            hits = Counter()
+            for ingredient_id in have:
+                hits.update(self.postings.get(ingredient_id, ()))
+            scored = heapq.nsmallest(limit, (
+                (-count / len(self.recipes[recipe_id]), -count, recipe_id)
+                for recipe_id, count in hits.items()
+            ))
+            return [
+                (
+                    recipe_id,
+                    -coverage,
+                    [id for id in self.recipes[recipe_id] if id not in have]
+                )
+                for coverage, _, recipe_id in scored
+            ]
+
+
+match_index = IngredientMatchIndex()
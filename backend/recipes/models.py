@@ -1,8 +1,23 @@
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
-from django.db.models import UniqueConstraint
+from django.db.models import (
+    Case,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    UniqueConstraint,
+    Value,
+    When
+)
+from django.db.models.functions import Greatest
 
-from users.models import User
+from users.models import Follow, ToggleQuerySet, User
 
 
 class Tag(models.Model):
@@ -61,6 +76,40 @@ class Ingredient(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Выборки рецептов."""
+
+    def with_related(self):
+        """Автор, теги и ингредиенты для сериализатора чтения."""
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient').order_by('id')
+            ),
+        )
+
+    def with_user_flags(self, user):
+        """Отметки избранного, списка покупок и подписки для user."""
+        if user.is_anonymous:
+            return self
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_subscribed=Exists(Follow.objects.filter(
+                user=user, author=OuterRef('author'))),
+        )
+
+    def for_read(self, user):
+        """Выборка рецептов для отдачи в API."""
+        return self.with_related().with_user_flags(user).defer(
+            'search_vector'
+        )
+
+
 class Recipe(models.Model):
     """Модель - Рецепт."""
 
@@ -103,11 +152,39 @@ class Recipe(models.Model):
         'Время публикации',
         auto_now_add=True,
     )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'В списках покупок',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ("name",)
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
+        indexes = [
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(fields=('name',), name='recipe_name_idx'),
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -162,11 +239,20 @@ class RecipeTag(models.Model):
                 name='recipe_tag_unique'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('tag', 'recipe'),
+                name='recipetag_tag_recipe_idx'
+            ),
+        ]
 
 
 class ShoppingCart(models.Model):
     """Модель - Список покупок."""
 
+    counter_field = 'in_carts_count'
+    user_flag = 'is_in_shopping_cart'
+
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -180,6 +266,8 @@ class ShoppingCart(models.Model):
         related_name='shopping_cart'
     )
 
+    objects = ToggleQuerySet.as_manager()
+
     class Meta:
         constraints = [
             UniqueConstraint(
@@ -187,11 +275,20 @@ class ShoppingCart(models.Model):
                 name='user_shoppingcart_unique'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('recipe', 'user'),
+                name='shoppingcart_recipe_user_idx'
+            ),
+        ]
 
 
 class Favorite(models.Model):
     """Модель - Избранное."""
 
+    counter_field = 'favorites_count'
+    user_flag = 'is_favorited'
+
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -205,6 +302,8 @@ class Favorite(models.Model):
         related_name='favorites'
     )
 
+    objects = ToggleQuerySet.as_manager()
+
     class Meta:
         constraints = [
             UniqueConstraint(
@@ -212,3 +311,229 @@ class Favorite(models.Model):
                 name='user_favorite_unique'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('recipe', 'user'),
+                name='favorite_recipe_user_idx'
+            ),
+        ]
+
+
+class ShoppingListQuerySet(models.QuerySet):
+    """Изменения сводного списка покупок."""
+
+    def recipe_amounts(self, recipe_ids, sign=1):
+        """Суммы ингредиентов рецептов recipe_ids со знаком sign."""
+        return {
+            ingredient_id: sign * amount
+            for ingredient_id, amount in RecipeIngredient.objects.filter(
+                recipe_id__in=recipe_ids
+            ).values('ingredient_id').annotate(
+                total=models.Sum('amount')
+            ).values_list('ingredient_id', 'total').order_by()
+        }
+
+    def apply(self, user_ids, amounts):
+        """
+        Добавить amounts (ингредиент -> изменение) в списки user_ids.
+        Недостающие строки вставляются с нулем через ON CONFLICT, затем
+        одно UPDATE прибавляет изменения к тому, что уже лежит в базе,
+        поэтому параллельные запросы не упираются в уникальность и не
+        теряют прибавки друг друга. Обнулившиеся строки удаляются.
+        """
+        amounts = {id: amount for id, amount in amounts.items() if amount}
+        user_ids = list(user_ids)
+        if not amounts or not user_ids:
+            return
+        self.bulk_create([
+            self.model(user_id=user_id, ingredient_id=ingredient_id, amount=0)
+            for user_id in user_ids
+            for ingredient_id, amount in amounts.items()
+            if amount > 0
+        ], ignore_conflicts=True)
+        rows = self.filter(user_id__in=user_ids, ingredient_id__in=amounts)
+        rows.update(amount=Greatest(F('amount') + Case(
+            *(
+                When(ingredient_id=ingredient_id, then=Value(amount))
+                for ingredient_id, amount in amounts.items()
+            ),
+            output_field=models.IntegerField()
+        ), 0))
+        if any(amount < 0 for amount in amounts.values()):
+            rows.filter(amount=0).delete()
+
+    def add_recipes(self, user_id, recipe_ids):
+        self.apply([user_id], self.recipe_amounts(recipe_ids))
+
+    def remove_recipes(self, user_id, recipe_ids):
+        self.apply([user_id], self.recipe_amounts(recipe_ids, sign=-1))
+
+    def rebuild(self):
+        """Пересобрать все списки из рецептов в списках покупок."""
+        self.all().delete()
+        self.bulk_create(
+            self.model(
+                user_id=row['recipe__shopping_cart__user'],
+                ingredient_id=row['ingredient'],
+                amount=row['total']
+            )
+            for row in RecipeIngredient.objects.filter(
+                recipe__shopping_cart__isnull=False
+            ).values(
+                'recipe__shopping_cart__user', 'ingredient'
+            ).annotate(total=models.Sum('amount')).order_by().iterator()
+        )
+
+
+class ShoppingListItem(models.Model):
+    """Модель - Сводный список покупок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='shopping_list'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField('Количество')
+
+    objects = ShoppingListQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Ингредиент списка покупок"
+        verbose_name_plural = "Сводные списки покупок"
+        constraints = [
+            UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='user_ingredient_shoppinglist_unique'
+            )
+        ]
+
+
+class TimelineQuerySet(models.QuerySet):
+    """Ленты подписок, заполняемые при публикации рецептов."""
+
+    batch_size = 1000
+
+    def add_entries(self, entries):
+        entries = iter(entries)
+        while True:
+            batch = list(islice(entries, self.batch_size))
+            if not batch:
+                return
+            self.bulk_create(batch, ignore_conflicts=True)
+
+    def fan_out(self, recipe):
+        """Добавить рецепт в ленты всех подписчиков автора."""
+        self.add_entries(
+            self.model(
+                user_id=user_id,
+                recipe_id=recipe.id,
+                author_id=recipe.author_id,
+                pub_date=recipe.pub_date
+            )
+            for user_id in Follow.objects.filter(
+                author_id=recipe.author_id
+            ).values_list('user_id', flat=True).iterator()
+        )
+
+    def backfill(self, user_id, author_ids):
+        """Добавить в ленту user_id последние рецепты авторов."""
+        author_ids = list(author_ids)
+        recipes = Recipe.objects.filter(
+            author_id__in=author_ids
+        ).order_by('author_id', '-pub_date', '-id').values_list(
+            'author_id', 'id', 'pub_date'
+        )
+        if len(author_ids) == 1:
+            recipes = recipes[:settings.FEED_BACKFILL]
+        taken = Counter()
+        entries = []
+        for author_id, recipe_id, pub_date in recipes.iterator():
+            taken[author_id] += 1
+            if taken[author_id] <= settings.FEED_BACKFILL:
+                entries.append(self.model(
+                    user_id=user_id,
+                    recipe_id=recipe_id,
+                    author_id=author_id,
+                    pub_date=pub_date
+                ))
+        self.add_entries(entries)
+
+    def drop(self, user_id, author_ids):
+        self.filter(user_id=user_id, author_id__in=author_ids).delete()
+
+    def rebuild(self):
+        """Пересобрать все ленты по текущим подпискам."""
+        self.all().delete()
+        followers = defaultdict(list)
+        for user_id, author_id in Follow.objects.values_list(
+            'user_id', 'author_id'
+        ).iterator():
+            followers[author_id].append(user_id)
+        for author_id, user_ids in followers.items():
+            recipes = Recipe.objects.filter(
+                author_id=author_id
+            ).order_by('-pub_date', '-id').values_list(
+                'id', 'pub_date'
+            )[:settings.FEED_BACKFILL]
+            self.add_entries(
+                self.model(
+                    user_id=user_id,
+                    recipe_id=recipe_id,
+                    author_id=author_id,
+                    pub_date=pub_date
+                )
+                for recipe_id, pub_date in recipes
+                for user_id in user_ids
+            )
+
+
+class TimelineEntry(models.Model):
+    """Модель - Рецепт в ленте подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='timeline'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор рецепта',
+        related_name='+'
+    )
+    pub_date = models.DateTimeField('Время публикации')
+
+    objects = TimelineQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Рецепт ленты"
+        verbose_name_plural = "Ленты подписок"
+        constraints = [
+            UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='user_recipe_timeline_unique'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='timeline_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='timeline_user_author_idx'
+            ),
+        ]
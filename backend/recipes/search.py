@@ -0,0 +1,127 @@
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramSimilarity
+)
+from django.db import connection, connections
+from django.db.models import (
+    Case,
+    Exists,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    Value,
+    When
+)
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+SEARCH_CONFIG = 'russian'
+
+POSTGRES_SQL = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS recipe_search_vector_idx
+    ON {recipe} USING gin (search_vector);
+CREATE INDEX IF NOT EXISTS recipe_name_trgm_idx
+    ON {recipe} USING gin (name gin_trgm_ops);
+
+CREATE OR REPLACE FUNCTION {recipe}_search_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('{config}', coalesce(NEW.name, '')), 'A')
+        || setweight(to_tsvector('{config}', coalesce((
+            SELECT string_agg(i.name, ' ')
+            FROM {recipeingredient} ri
+            JOIN {ingredient} i ON i.id = ri.ingredient_id
+            WHERE ri.recipe_id = NEW.id
+        ), '')), 'B')
+        || setweight(to_tsvector('{config}', coalesce(NEW.text, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS recipe_search_update ON {recipe};
+CREATE TRIGGER recipe_search_update
+    BEFORE INSERT OR UPDATE OF name, text ON {recipe}
+    FOR EACH ROW EXECUTE PROCEDURE {recipe}_search_update();
+
+CREATE OR REPLACE FUNCTION {recipeingredient}_search_touch()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE {recipe} SET name = name
+        WHERE id IN (SELECT recipe_id FROM old_rows);
+    ELSE
+        UPDATE {recipe} SET name = name
+        WHERE id IN (SELECT recipe_id FROM new_rows);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS recipeingredient_search_insert ON {recipeingredient};
+CREATE TRIGGER recipeingredient_search_insert
+    AFTER INSERT ON {recipeingredient}
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE {recipeingredient}_search_touch();
+
+DROP TRIGGER IF EXISTS recipeingredient_search_update ON {recipeingredient};
+CREATE TRIGGER recipeingredient_search_update
+    AFTER UPDATE ON {recipeingredient}
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE {recipeingredient}_search_touch();
+
+DROP TRIGGER IF EXISTS recipeingredient_search_delete ON {recipeingredient};
+CREATE TRIGGER recipeingredient_search_delete
+    AFTER DELETE ON {recipeingredient}
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE {recipeingredient}_search_touch();
+
+UPDATE {recipe} SET name = name WHERE search_vector IS NULL;
+"""
+
+
+def install_search(using='default', **kwargs):
+    """
+    Триггеры и индексы полнотекстового поиска для PostgreSQL.
+    Вызывается после migrate, повторный запуск ничего не ломает.
+    """
+    if connections[using].vendor != 'postgresql':
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(POSTGRES_SQL.format(
+            config=SEARCH_CONFIG,
+            recipe=Recipe._meta.db_table,
+            recipeingredient=RecipeIngredient._meta.db_table,
+            ingredient=Ingredient._meta.db_table,
+        ))
+
+
+def search_recipes(queryset, value):
+    """Рецепты, найденные по value, от самых подходящих."""
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(value, config=SEARCH_CONFIG)
+        return queryset.annotate(
+            rank=SearchRank(F('search_vector'), query)
+            + TrigramSimilarity('name', value)
+        ).filter(
+            Q(search_vector=query) | Q(name__trigram_similar=value)
+        ).order_by('-rank', '-pub_date')
+    return queryset.annotate(
+        in_ingredients=Exists(RecipeIngredient.objects.filter(
+            recipe=OuterRef('pk'),
+            ingredient__name__icontains=value
+        )),
+        rank=Case(
+            When(name__icontains=value, then=Value(2)),
+            When(in_ingredients=True, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField()
+        ),
+    ).filter(
+        Q(name__icontains=value)
+        | Q(text__icontains=value)
+        | Q(in_ingredients=True)
+    ).order_by('-rank', '-pub_date')
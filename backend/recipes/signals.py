@@ -0,0 +1,127 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from recipes.cache import (
+    INGREDIENTS_VERSION,
+    RECIPE_VERSION,
+    TAGS_VERSION,
+    USER_VERSION,
+    bump_on_commit
+)
+from recipes.matching import recipe_changed
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    ShoppingCart,
+    ShoppingListItem,
+    Tag,
+    TimelineEntry
+)
+from users.models import Follow, User, counter_shift
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredients_changed(**kwargs):
+    bump_on_commit(INGREDIENTS_VERSION)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tags_changed(**kwargs):
+    bump_on_commit(TAGS_VERSION)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(instance, created, **kwargs):
+    if created:
+        User.objects.filter(id=instance.author_id).update(
+            recipes_count=counter_shift('recipes_count', 1)
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(instance, created, **kwargs):
+    if created:
+        TimelineEntry.objects.fan_out(instance)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def recipe_marked(sender, instance, created, **kwargs):
+    if created:
+        Recipe.objects.filter(id=instance.recipe_id).update(**{
+            sender.counter_field: counter_shift(sender.counter_field, 1)
+        })
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def recipe_unmarked(sender, instance, **kwargs):
+    Recipe.objects.filter(id=instance.recipe_id).update(**{
+        sender.counter_field: counter_shift(sender.counter_field, -1)
+    })
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(instance, created, **kwargs):
+    if created:
+        User.objects.filter(id=instance.author_id).update(
+            followers_count=counter_shift('followers_count', 1)
+        )
+        TimelineEntry.objects.backfill(
+            instance.user_id, [instance.author_id]
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(instance, **kwargs):
+    User.objects.filter(id=instance.author_id).update(
+        followers_count=counter_shift('followers_count', -1)
+    )
+    TimelineEntry.objects.drop(instance.user_id, [instance.author_id])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    User.objects.filter(id=instance.author_id).update(
+        recipes_count=counter_shift('recipes_count', -1)
+    )
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_leaves_shopping_lists(instance, **kwargs):
+    ShoppingListItem.objects.apply(
+        ShoppingCart.objects.filter(
+            recipe=instance
+        ).values_list('user_id', flat=True),
+        ShoppingListItem.objects.recipe_amounts([instance.id], sign=-1)
+    )
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredients_changed(instance, **kwargs):
+    recipe_changed(instance.recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_body_changed(instance, **kwargs):
+    bump_on_commit(RECIPE_VERSION.format(instance.id))
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+def recipe_relation_changed(instance, **kwargs):
+    bump_on_commit(RECIPE_VERSION.format(instance.recipe_id))
+
+
+@receiver(post_save, sender=User)
+def author_changed(instance, **kwargs):
+    bump_on_commit(USER_VERSION.format(instance.id))
@@ -0,0 +1,108 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    Tag
+)
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def make_user(username):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@foodgram.local',
+        first_name='Имя',
+        last_name='Фамилия',
+        password='pass-Word-123'
+    )
+
+
+@pytest.fixture
+def user(db):
+    return make_user('user')
+
+
+@pytest.fixture
+def author(db):
+    return make_user('author')
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key
+    )
+    return client
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        Tag.objects.create(name=name, color=color, slug=slug)
+        for name, color, slug in (
+            ('Завтрак', '#E26C2D', 'breakfast'),
+            ('Обед', '#49B64E', 'lunch'),
+            ('Ужин', '#8775D2', 'dinner'),
+        )
+    ]
+
+
+@pytest.fixture
+def ingredients(db):
+    return [
+        Ingredient.objects.create(name=name, measurement_unit=unit)
+        for name, unit in (
+            ('мука', 'г'),
+            ('молоко', 'мл'),
+            ('яйца', 'шт'),
+            ('сахар', 'г'),
+        )
+    ]
+
+
+@pytest.fixture
+def make_recipes(author, tags, ingredients):
+    """Создать count рецептов автора с тегами и ингредиентами."""
+
+    def make(count):
+        start = Recipe.objects.count()
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                name=f'Рецепт {start + i}',
+                image='recipes/images/recipe.png',
+                text='Описание',
+                cooking_time=10 + i % 50
+            )
+            for i in range(count)
+        )
+        recipes = list(Recipe.objects.order_by('id')[start:])
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag=tag)
+            for index, recipe in enumerate(recipes)
+            for tag in tags[:1 + index % len(tags)]
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient=ingredient, amount=10 * (i + 1)
+            )
+            for recipe in recipes
+            for i, ingredient in enumerate(ingredients[:3])
+        )
+        return recipes
+
+    return make
@@ -0,0 +1,47 @@
+from recipes.models import Favorite, Recipe
+
+URL = '/api/recipes/favorite/'
+
+
+def statuses(response):
+    assert response.status_code == 200, response.content
+    return [result['status'] for result in response.json()['results']]
+
+
+def test_favorite_batch_add_and_remove(make_recipes, user, user_client):
+    ids = [recipe.id for recipe in make_recipes(5)]
+    assert statuses(
+        user_client.post(URL, {'ids': ids[:3]}, format='json')
+    ) == ['added'] * 3
+    assert statuses(
+        user_client.delete(URL, {'ids': ids[1:] + [9999]}, format='json')
+    ) == ['removed', 'removed', 'missing', 'missing', 'not_found']
+    assert list(Favorite.objects.filter(
+        user=user
+    ).values_list('recipe_id', flat=True)) == [ids[0]]
+    counts = dict(Recipe.objects.values_list('id', 'favorites_count'))
+    assert [counts[id] for id in ids] == [1, 0, 0, 0, 0]
+
+
+def test_second_remove_does_not_touch_counter(make_recipes, user):
+    recipe = make_recipes(1)[0]
+    Favorite.objects.create(user=user, recipe=recipe)
+    Recipe.objects.filter(id=recipe.id).update(favorites_count=5)
+    assert Favorite.objects.remove(user_id=user.id, recipe_id=recipe.id)
+    assert not Favorite.objects.remove(user_id=user.id, recipe_id=recipe.id)
+    assert Recipe.objects.get(id=recipe.id).favorites_count == 4
+
+
+def test_delete_where_returns_only_deleted_rows(make_recipes, user):
+    recipes = make_recipes(3)
+    favorites = [
+        Favorite.objects.create(user=user, recipe=recipe).id
+        for recipe in recipes[:2]
+    ]
+    ids = [recipe.id for recipe in recipes]
+    assert sorted(Favorite.objects.delete_where(
+        returning='pk', user_id=user.id, recipe_id__in=ids
+    )) == favorites
+    assert Favorite.objects.delete_where(
+        returning='pk', user_id=user.id, recipe_id__in=ids
+    ) == []
@@ -0,0 +1,16 @@
+import base64
+import os
+
+from api.fields import CHUNK_SIZE, Base64ImageField
+
+
+def test_decode_wrapped_base64_spanning_chunks():
+    data = os.urandom(CHUNK_SIZE * 2)
+    encoded = base64.encodebytes(data).decode()
+    assert '\n' in encoded[:CHUNK_SIZE]
+    upload = Base64ImageField().decode(encoded, 'png')
+    try:
+        assert upload.size == len(data)
+        assert upload.read() == data
+    finally:
+        upload.close()
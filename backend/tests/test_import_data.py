@@ -0,0 +1,24 @@
+import io
+
+import pytest
+from django.core.management.base import CommandError
+
+from recipes.management.commands.import_test_data import iter_json_array
+
+
+@pytest.mark.parametrize('text', [
+    '',
+    '{"name": "мука"}',
+    '[{"name": "мука"}, {"name": ]',
+    '[{"name": "мука"}, {"name": "соль"}',
+])
+def test_broken_json_array_is_an_error(text):
+    with pytest.raises(CommandError):
+        list(iter_json_array(io.StringIO(text), chunk_size=8))
+
+
+def test_json_array_across_chunks():
+    text = '[{"name": "мука"},\n {"name": "соль"}\n]\n'
+    assert list(iter_json_array(io.StringIO(text), chunk_size=8)) == [
+        {'name': 'мука'}, {'name': 'соль'}
+    ]
@@ -0,0 +1,42 @@
+import base64
+import json
+
+import pytest
+
+BAD_VALUES = (
+    ['not-a-date', 1],
+    ['2026-01-01T00:00:00+00:00', 'x'],
+    ['2026-01-01T00:00:00+00:00', None],
+    [{}, []],
+)
+
+
+def cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+@pytest.mark.parametrize('values', BAD_VALUES)
+@pytest.mark.parametrize('url', ('/api/recipes/', '/api/recipes/feed/'))
+def test_bad_cursor_values_are_not_found(make_recipes, user_client, url,
+                                         values):
+    make_recipes(2)
+    response = user_client.get(url, {'cursor': cursor(values)})
+    assert response.status_code == 404, response.content
+
+
+@pytest.mark.parametrize('values', (['x'], [None], [[1]]))
+def test_bad_subscriptions_cursor_is_not_found(user_client, values):
+    response = user_client.get(
+        '/api/users/subscriptions/', {'cursor': cursor(values)}
+    )
+    assert response.status_code == 404, response.content
+
+
+def test_valid_cursor_pages_recipes(make_recipes, user_client):
+    make_recipes(3)
+    response = user_client.get('/api/recipes/', {'cursor': '', 'limit': 2})
+    assert response.status_code == 200, response.content
+    next_link = response.json()['next']
+    response = user_client.get(next_link)
+    assert response.status_code == 200, response.content
+    assert len(response.json()['results']) == 1
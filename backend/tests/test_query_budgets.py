@@ -0,0 +1,117 @@
+import base64
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+# Бюджеты из settings.QUERY_BUDGETS проверяет InstrumentationMiddleware,
+# в строгом режиме превышение поднимает QueryBudgetExceededError, и
+# тестовый клиент пробрасывает его в тест.
+
+
+@pytest.fixture(autouse=True)
+def strict_budgets(settings):
+    settings.QUERY_BUDGET_STRICT = True
+
+
+@pytest.fixture
+def recipes(make_recipes, user, author):
+    recipes = make_recipes(12)
+    for recipe in recipes[:4]:
+        Favorite.objects.create(user=user, recipe=recipe)
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+    Follow.objects.create(user=user, author=author)
+    return recipes
+
+
+def png():
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), 'orange').save(buffer, 'PNG')
+    return (
+        'data:image/png;base64,'
+        + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+@pytest.mark.parametrize('url', [
+    '/api/recipes/',
+    '/api/recipes/?limit=6&is_favorited=1',
+    '/api/recipes/?is_in_shopping_cart=1&tags=breakfast',
+    '/api/recipes/feed/',
+    '/api/recipes/feed/?strategy=write',
+    '/api/recipes/shopping_list/',
+    '/api/users/subscriptions/',
+    '/api/ingredients/',
+    '/api/ingredients/?name=мо',
+    '/api/tags/',
+])
+def test_read_endpoints_within_budget(url, recipes, user_client):
+    for _ in range(2):
+        response = user_client.get(url)
+        assert response.status_code == 200, response.content
+
+
+def test_recipe_detail_within_budget(recipes, user_client, client):
+    for api_client in (user_client, client):
+        response = api_client.get(f'/api/recipes/{recipes[0].id}/')
+        assert response.status_code == 200
+
+
+def test_match_within_budget(recipes, ingredients, client):
+    ids = ','.join(str(ingredient.id) for ingredient in ingredients[:2])
+    response = client.get(f'/api/recipes/match/?ingredients={ids}')
+    assert response.status_code == 200
+    assert response.json()
+
+
+def test_download_shopping_cart_within_budget(recipes, user_client):
+    response = user_client.get('/api/recipes/download_shopping_cart/')
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content)
+
+
+@pytest.mark.parametrize('action', ['favorite', 'shopping_cart'])
+def test_mark_endpoints_within_budget(action, recipes, user_client):
+    url = f'/api/recipes/{recipes[-1].id}/{action}/'
+    assert user_client.post(url).status_code == 201
+    assert user_client.delete(url).status_code == 204
+    ids = [recipe.id for recipe in recipes[2:8]]
+    batch = f'/api/recipes/{action}/'
+    for method in (user_client.post, user_client.delete):
+        response = method(batch, {'ids': ids}, format='json')
+        assert response.status_code == 200
+
+
+def test_subscribe_endpoints_within_budget(recipes, author, user_client):
+    url = f'/api/users/{author.id}/subscribe/'
+    assert user_client.delete(url).status_code == 204
+    assert user_client.post(url).status_code == 201
+    for method in (user_client.delete, user_client.post):
+        response = method(
+            '/api/users/subscribe/', {'ids': [author.id]}, format='json'
+        )
+        assert response.status_code == 200
+
+
+def test_recipe_write_within_budget(tags, ingredients, user_client):
+    data = {
+        'name': 'Сырники',
+        'text': 'Смешать и жарить',
+        'cooking_time': 20,
+        'image': png(),
+        'tags': [tag.id for tag in tags[:2]],
+        'ingredients': [
+            {'id': ingredient.id, 'amount': 100}
+            for ingredient in ingredients[:3]
+        ],
+    }
+    response = user_client.post('/api/recipes/', data, format='json')
+    assert response.status_code == 201, response.content
+    data['ingredients'] = data['ingredients'][1:]
+    response = user_client.patch(
+        f'/api/recipes/{response.json()["id"]}/', data, format='json'
+    )
+    assert response.status_code == 200, response.content
@@ -0,0 +1,21 @@
+import pytest
+
+# Токен, COUNT страницы, id рецептов с отметками зрителя и три запроса
+# на тела рецептов: рецепты с авторами, теги, ингредиенты.
+RECIPE_PAGE_QUERIES = 6
+
+
+@pytest.mark.parametrize('size', [6, 60, 600])
+def test_recipe_page_query_count(
+    size, make_recipes, user_client, django_assert_num_queries
+):
+    make_recipes(size)
+    with django_assert_num_queries(RECIPE_PAGE_QUERIES):
+        response = user_client.get(f'/api/recipes/?limit={size}')
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert len(results) == size
+    assert all(
+        len(recipe['tags']) and len(recipe['ingredients']) == 3
+        for recipe in results
+    )
@@ -0,0 +1,40 @@
+from recipes.models import Recipe, RecipeIngredient, RecipeTag
+
+
+def recipe_state(recipe):
+    return (
+        sorted(RecipeTag.objects.filter(
+            recipe=recipe
+        ).values_list('tag_id', flat=True)),
+        sorted(RecipeIngredient.objects.filter(
+            recipe=recipe
+        ).values_list('ingredient_id', 'amount')),
+    )
+
+
+def test_patch_only_name_keeps_tags_and_ingredients(
+    make_recipes, author, user_client
+):
+    recipe = make_recipes(3)[2]
+    user_client.force_authenticate(author)
+    before = recipe_state(recipe)
+    response = user_client.patch(
+        f'/api/recipes/{recipe.id}/', {'name': 'Новое название'},
+        format='json'
+    )
+    assert response.status_code == 200, response.content
+    assert response.json()['name'] == 'Новое название'
+    assert Recipe.objects.get(id=recipe.id).name == 'Новое название'
+    assert recipe_state(recipe) == before
+
+
+def test_patch_ingredients_is_validated(make_recipes, author, user_client):
+    recipe = make_recipes(1)[0]
+    user_client.force_authenticate(author)
+    response = user_client.patch(
+        f'/api/recipes/{recipe.id}/',
+        {'ingredients': [{'id': 999, 'amount': 5}]},
+        format='json'
+    )
+    assert response.status_code == 400
+    assert 'ingredients' in response.json()
@@ -0,0 +1,121 @@
+from collections import OrderedDict
+from pathlib import Path
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api import mixins
+from api.renderers import ORJSONRenderer
+from api.representations import recipe_bodies
+from api.serializers import RecipeSerializerRead
+from recipes.models import (
+    Favorite,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    ShoppingCart
+)
+from users.models import Follow
+
+GOLDEN = Path(__file__).parent / 'golden'
+
+
+@pytest.fixture
+def recipes(author, user, tags, ingredients):
+    """Рецепты с фиксированными id и отметками зрителя user."""
+    recipes = [
+        Recipe.objects.create(
+            id=id,
+            author=author,
+            name=name,
+            image=f'recipes/images/{image}',
+            text=text,
+            cooking_time=time
+        )
+        for id, name, image, text, time in (
+            (101, 'Блины', 'pancakes.jpg', 'Смешать и «жарить»\n', 30),
+            (102, 'Омлет', 'omelette.png', 'Взбить яйца', 10),
+        )
+    ]
+    RecipeTag.objects.bulk_create([
+        RecipeTag(recipe=recipes[0], tag=tags[0]),
+        RecipeTag(recipe=recipes[0], tag=tags[2]),
+        RecipeTag(recipe=recipes[1], tag=tags[1]),
+    ])
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(
+            recipe=recipes[0], ingredient=ingredients[0], amount=200
+        ),
+        RecipeIngredient(
+            recipe=recipes[0], ingredient=ingredients[1], amount=500
+        ),
+        RecipeIngredient(
+            recipe=recipes[1], ingredient=ingredients[2], amount=3
+        ),
+    ])
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    ShoppingCart.objects.create(user=user, recipe=recipes[1])
+    Follow.objects.create(user=user, author=author)
+    return recipes
+
+
+def serialized(user, ids, many=False):
+    """Те же рецепты через RecipeSerializerRead."""
+    request = Request(APIRequestFactory().get('/api/recipes/'))
+    request.user = user
+    found = Recipe.objects.for_read(user).in_bulk(ids)
+    recipes = [found[id] for id in ids]
+    return RecipeSerializerRead(
+        recipes if many else recipes[0],
+        many=many,
+        context={'request': request}
+    ).data
+
+
+def page(results):
+    return OrderedDict([
+        ('count', len(results)),
+        ('next', None),
+        ('previous', None),
+        ('results', results),
+    ])
+
+
+def golden(name):
+    return (GOLDEN / name).read_bytes().rstrip(b'\n')
+
+
+def test_recipe_detail_matches_serializer(recipes, user, user_client):
+    response = user_client.get('/api/recipes/101/')
+    assert response.content == ORJSONRenderer().render(
+        serialized(user, [101])
+    )
+    assert response.content == golden('recipe_detail.json')
+
+
+def test_recipe_list_matches_serializer(recipes, user, user_client):
+    response = user_client.get('/api/recipes/')
+    assert response.content == ORJSONRenderer().render(
+        page(serialized(user, [101, 102], many=True))
+    )
+    assert response.content == golden('recipe_list.json')
+
+
+def test_anonymous_recipe_list_matches_serializer(recipes, client):
+    response = client.get('/api/recipes/')
+    assert response.content == ORJSONRenderer().render(
+        page(serialized(AnonymousUser(), [101, 102], many=True))
+    )
+
+
+def test_recipe_deleted_before_render_is_not_found(recipes, user_client,
+                                                   monkeypatch):
+    def delete_then_render(ids, request=None):
+        Recipe.objects.filter(id__in=ids).delete()
+        return recipe_bodies(ids, request)
+
+    monkeypatch.setattr(mixins, 'recipe_bodies', delete_then_render)
+    response = user_client.get('/api/recipes/101/')
+    assert response.status_code == 404, response.content
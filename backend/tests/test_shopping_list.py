@@ -0,0 +1,30 @@
+from recipes.models import ShoppingListItem
+
+
+def shopping_list(user):
+    return dict(ShoppingListItem.objects.filter(
+        user=user
+    ).values_list('ingredient__name', 'amount'))
+
+
+def test_amounts_follow_cart(make_recipes, user, user_client):
+    first, second = make_recipes(2)
+    for recipe in (first, second):
+        url = f'/api/recipes/{recipe.id}/shopping_cart/'
+        assert user_client.post(url).status_code == 201
+    assert shopping_list(user) == {'мука': 20, 'молоко': 40, 'яйца': 60}
+    user_client.delete(f'/api/recipes/{first.id}/shopping_cart/')
+    assert shopping_list(user) == {'мука': 10, 'молоко': 20, 'яйца': 30}
+    user_client.delete(f'/api/recipes/{second.id}/shopping_cart/')
+    assert shopping_list(user) == {}
+
+
+def test_row_inserted_by_parallel_request_is_added_to(
+    make_recipes, ingredients, user
+):
+    recipe = make_recipes(1)[0]
+    ShoppingListItem.objects.create(
+        user=user, ingredient=ingredients[0], amount=5
+    )
+    ShoppingListItem.objects.add_recipes(user.id, [recipe.id])
+    assert shopping_list(user) == {'мука': 15, 'молоко': 20, 'яйца': 30}
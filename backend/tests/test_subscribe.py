@@ -0,0 +1,26 @@
+from users.models import Follow
+
+
+def test_subscribe_to_self_is_rejected(user, user_client):
+    response = user_client.post(f'/api/users/{user.id}/subscribe/')
+    assert response.status_code == 400
+    assert response.json() == {
+        'errors': 'Нельзя подписаться на самого себя!'
+    }
+    assert not Follow.objects.exists()
+
+
+def test_batch_subscribe_to_self_is_rejected(user, author, user_client):
+    response = user_client.post(
+        '/api/users/subscribe/', {'ids': [author.id, user.id]},
+        format='json'
+    )
+    assert response.status_code == 400
+    assert not Follow.objects.exists()
+
+
+def test_subscribe_to_author(user, author, user_client):
+    response = user_client.post(f'/api/users/{author.id}/subscribe/')
+    assert response.status_code == 201
+    assert response.json()['is_subscribed'] is True
+    assert Follow.objects.filter(user=user, author=author).exists()
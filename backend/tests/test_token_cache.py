@@ -0,0 +1,42 @@
+from users.models import User
+from users.tokens import forget_user_tokens
+
+URL = '/api/users/me/'
+
+
+def test_deactivation_by_save_revokes_cached_token(user, user_client):
+    assert user_client.get(URL).status_code == 200
+    user.is_active = False
+    user.save()
+    assert user_client.get(URL).status_code == 401
+
+
+def test_deactivation_by_update_needs_forget_user_tokens(user, user_client):
+    assert user_client.get(URL).status_code == 200
+    User.objects.filter(id=user.id).update(is_active=False)
+    assert user_client.get(URL).status_code == 200
+    forget_user_tokens(user.id)
+    assert user_client.get(URL).status_code == 401
+
+
+def test_logout_revokes_cached_token(user_client):
+    assert user_client.get(URL).status_code == 200
+    assert user_client.post('/api/auth/token/logout/').status_code == 204
+    assert user_client.get(URL).status_code == 401
+
+
+def test_writes_through_cached_user_keep_counters(user, user_client):
+    assert user_client.get(URL).status_code == 200
+    User.objects.filter(id=user.id).update(
+        recipes_count=3, followers_count=7
+    )
+    response = user_client.patch(URL, {'first_name': 'Новое'})
+    assert response.status_code == 200, response.content
+    response = user_client.post('/api/users/set_password/', {
+        'current_password': 'pass-Word-123',
+        'new_password': 'new-pass-Word-456',
+    })
+    assert response.status_code == 204, response.content
+    assert User.objects.values_list(
+        'first_name', 'recipes_count', 'followers_count'
+    ).get(id=user.id) == ('Новое', 3, 7)
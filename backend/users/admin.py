@@ -2,4 +2,18 @@ from django.contrib import admin
 
 from .models import User
 
-admin.site.register(User)
+
+class UserAdmin(admin.ModelAdmin):
+    list_display = (
+        'username',
+        'email',
+        'first_name',
+        'last_name',
+        'recipes_count',
+        'followers_count',
+    )
+    search_fields = ('username', 'email')
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(User, UserAdmin)
@@ -1,10 +1,174 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
-from django.db.models import UniqueConstraint
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import F, UniqueConstraint
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
 
 from users.validators import validate_username
 
 
+def counter_shift(field, delta):
+    """
+    Выражение для счетчика field, измененного на delta. Уменьшение
+    не опускается ниже нуля, даже если счетчик уже разошелся с данными.
+    """
+    if delta >= 0:
+        return F(field) + delta
+    return Greatest(F(field) + delta, 0)
+
+
+class ToggleQuerySet(models.QuerySet):
+    """
+    Добавление и удаление связи одним запросом без гонок:
+    повторная вставка упирается в уникальное ограничение.
+    """
+
+    def insert_ignore(self, rows, returning):
+        """
+        PostgreSQL: INSERT ... ON CONFLICT DO NOTHING RETURNING,
+        вернуть значения поля returning у вставленных строк.
+        """
+        connection = connections[self.db]
+        meta = self.model._meta
+        names = list(rows[0])
+        columns = [meta.get_field(name).column for name in names]
+        row = '({})'.format(', '.join(['%s'] * len(columns)))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {} ({}) VALUES {} '
+                'ON CONFLICT DO NOTHING RETURNING {}'.format(
+                    connection.ops.quote_name(meta.db_table),
+                    ', '.join(map(connection.ops.quote_name, columns)),
+                    ', '.join([row] * len(rows)),
+                    connection.ops.quote_name(
+                        meta.get_field(returning).column
+                    )
+                ),
+                [values[name] for values in rows for name in names]
+            )
+            return [value for value, in cursor.fetchall()]
+
+    def add(self, **values):
+        """Вставить строку, вернуть False, если она уже есть."""
+        if connections[self.db].vendor != 'postgresql':
+            try:
+                with transaction.atomic(using=self.db):
+                    self.create(**values)
+            except IntegrityError:
+                return False
+            return True
+        inserted = self.insert_ignore([values], self.model._meta.pk.name)
+        if not inserted:
+            return False
+        post_save.send(
+            sender=self.model,
+            instance=self.model(pk=inserted[0], **values),
+            created=True,
+            update_fields=None,
+            raw=False,
+            using=self.db
+        )
+        return True
+
+    def remove(self, **values):
+        """
+        Удалить строку одним DELETE, вернуть False, если ее не было.
+        post_delete уходит только за строку, которую удалил этот запрос:
+        при двух одновременных удалениях счетчики уменьшатся один раз.
+        """
+        if connections[self.db].vendor == 'postgresql':
+            deleted = self.delete_where(returning='pk', **values)
+        else:
+            deleted = list(self.filter(**values).values_list('pk', flat=True))
+            if deleted and not self.delete_where(pk__in=deleted):
+                deleted = []
+        for pk in deleted:
+            post_delete.send(
+                sender=self.model,
+                instance=self.model(pk=pk, **values),
+                using=self.db
+            )
+        return bool(deleted)
+
+    def add_many(self, field, targets, **values):
+        """
+        Вставить строки values с каждым значением field из targets,
+        вернуть множество значений, для которых строка появилась.
+        Как и bulk_create, сигналы не отправляет.
+        """
+        targets = list(targets)
+        if not targets:
+            return set()
+        if connections[self.db].vendor == 'postgresql':
+            return set(self.insert_ignore(
+                [{**values, field: target} for target in targets], field
+            ))
+        existing = set(self.filter(
+            **values, **{f'{field}__in': targets}
+        ).values_list(field, flat=True))
+        added = [target for target in targets if target not in existing]
+        self.bulk_create(
+            [self.model(**values, **{field: target}) for target in added],
+            ignore_conflicts=True
+        )
+        return set(added)
+
+    def delete_where(self, returning=None, **lookups):
+        """
+        DELETE по lookups вида поле=значение или поле__in=список в обход
+        Collector и сигналов. С returning (только PostgreSQL) вернуть
+        значения этого поля у удаленных строк, иначе их число.
+        """
+        connection = connections[self.db]
+        meta = self.model._meta
+        conditions, params = [], []
+        for lookup, value in lookups.items():
+            name, _, operator = lookup.partition('__')
+            field = meta.pk if name == 'pk' else meta.get_field(name)
+            column = connection.ops.quote_name(field.column)
+            if operator == 'in':
+                conditions.append('{} IN ({})'.format(
+                    column, ', '.join(['%s'] * len(value))
+                ))
+                params.extend(value)
+            else:
+                conditions.append(f'{column} = %s')
+                params.append(value)
+        sql = 'DELETE FROM {} WHERE {}'.format(
+            connection.ops.quote_name(meta.db_table),
+            ' AND '.join(conditions)
+        )
+        if returning:
+            field = meta.pk if returning == 'pk' else meta.get_field(returning)
+            sql += ' RETURNING {}'.format(
+                connection.ops.quote_name(field.column)
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            if returning:
+                return [value for value, in cursor.fetchall()]
+            return cursor.rowcount
+
+    def remove_many(self, field, targets, **values):
+        """
+        Удалить строки values со значениями field из targets одним
+        DELETE без сигналов, вернуть множество удаленных значений.
+        """
+        targets = list(targets)
+        if not targets:
+            return set()
+        if connections[self.db].vendor == 'postgresql':
+            return set(self.delete_where(
+                returning=field, **values, **{f'{field}__in': targets}
+            ))
+        removed = set(self.filter(
+            **values, **{f'{field}__in': targets}
+        ).select_for_update().values_list(field, flat=True))
+        if removed:
+            self.delete_where(**values, **{f'{field}__in': list(removed)})
+        return removed
+
+
 class User(AbstractUser):
     """Пользовательская модель - Пользователь."""
 
@@ -25,6 +189,16 @@ class User(AbstractUser):
         'Юзернейм',
         max_length=150,
         validators=[validate_username])
+    recipes_count = models.PositiveIntegerField(
+        'Рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков',
+        default=0,
+        editable=False
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = (
@@ -58,6 +232,8 @@ class Follow(models.Model):
         verbose_name='Автор'
     )
 
+    objects = ToggleQuerySet.as_manager()
+
     class Meta:
         constraints = [
             UniqueConstraint(
@@ -65,6 +241,12 @@ class Follow(models.Model):
                 name='user_author_unique',
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user} подписался на {self.author}'
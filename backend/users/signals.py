@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from users.models import User
+from users.tokens import forget_token, forget_user_tokens
+
+
+@receiver(post_save, sender=User)
+def user_changed(instance, **kwargs):
+    forget_user_tokens(instance.id)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    forget_token(instance.key)
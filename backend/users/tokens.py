@@ -0,0 +1,37 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+
+TOKEN_KEY = 'auth_token:{}'
+
+
+def token_cache_key(key):
+    """Ключ кеша по хешу токена, чтобы сам токен не попадал в кеш."""
+    return TOKEN_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def get_cached_token(key):
+    return cache.get(token_cache_key(key))
+
+
+def cache_token(token):
+    """Сохранить токен вместе с пользователем на TOKEN_CACHE_TIMEOUT."""
+    cache.set(
+        token_cache_key(token.key), token, settings.TOKEN_CACHE_TIMEOUT
+    )
+
+
+def forget_token(key):
+    cache.delete(token_cache_key(key))
+
+
+def forget_user_tokens(user_id):
+    """Сбросить кеш всех токенов пользователя."""
+    cache.delete_many([
+        token_cache_key(key)
+        for key in Token.objects.filter(
+            user_id=user_id
+        ).values_list('key', flat=True)
+    ])